@@ -0,0 +1,386 @@
+import copy
+import json
+import struct
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+
+# Marks a field the result doesn't have, as opposed to one set to None after an error
+_MISSING = object()
+
+_DOUBLE = struct.Struct('<d')
+
+class AnalysisResult(MutableMapping):
+    """Compact analysis results that still behave like the dict they replace.
+    
+    Each feature lives in its own slot as tuples and floats instead of nested
+    dicts, and encode()/decode() give a small binary form for caches and
+    archives. result['sentiment'] and friends build the familiar dict and list
+    shapes on every access, so change a nested value by assigning the whole
+    feature again rather than editing what you got back.
+    """
+    
+    __slots__ = ('_sentiment', '_key_phrases', '_entities', '_language', '_pii_entities',
+                 '_errors', '_degraded', '_extra')
+    
+    # Keys with a slot of their own, in the order they iterate and encode
+    FIELDS = ('sentiment', 'key_phrases', 'entities', 'language', 'pii_entities', 'errors', 'degraded')
+    
+    SENTIMENT_LABELS = ('positive', 'neutral', 'negative', 'mixed')
+    SCORE_NAMES = ('positive', 'neutral', 'negative')
+    
+    # encode() format version, first byte of every encoding
+    VERSION = 1
+    
+    # Field tag for keys without a slot, stored as JSON
+    _EXTRA_TAG = len(FIELDS)
+    _NONE_FLAG = 0x80
+    
+    def __init__(self, results: Union[Mapping, Iterable, None] = None, **kwargs):
+        for slot in self.__slots__:
+            setattr(self, slot, _MISSING)
+        self._extra = None
+        if results is not None:
+            self.update(results)
+        if kwargs:
+            self.update(kwargs)
+    
+    @classmethod
+    def from_dict(cls, results: Mapping) -> 'AnalysisResult':
+        """Wrap a results dict, returning AnalysisResult instances unchanged"""
+        if isinstance(results, AnalysisResult):
+            return results
+        return cls(results)
+    
+    def to_dict(self) -> Dict:
+        """Plain nested dict in the shape analyze_text_comprehensive used to return"""
+        return {key: self[key] for key in self}
+    
+    @property
+    def sentiment_scores(self) -> Optional[Tuple[float, float, float]]:
+        """(positive, neutral, negative) without building the sentiment dict, None if missing"""
+        sentiment = self._sentiment
+        if sentiment is _MISSING or sentiment is None:
+            return None
+        return sentiment[1:]
+    
+    # Mapping interface
+    
+    def __getitem__(self, key: str):
+        if key in AnalysisResult.FIELDS:
+            value = getattr(self, '_' + key)
+            if value is _MISSING:
+                raise KeyError(key)
+            return value if value is None else getattr(self, f'_unpack_{key}')(value)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+    
+    def __setitem__(self, key: str, value):
+        if key in AnalysisResult.FIELDS:
+            setattr(self, '_' + key, value if value is None else getattr(self, f'_pack_{key}')(value))
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+    
+    def __delitem__(self, key: str):
+        if key in AnalysisResult.FIELDS and getattr(self, '_' + key) is not _MISSING:
+            setattr(self, '_' + key, _MISSING)
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+    
+    def __iter__(self) -> Iterator[str]:
+        for key in AnalysisResult.FIELDS:
+            if getattr(self, '_' + key) is not _MISSING:
+                yield key
+        if self._extra:
+            yield from self._extra
+    
+    def __len__(self) -> int:
+        count = sum(getattr(self, '_' + key) is not _MISSING for key in AnalysisResult.FIELDS)
+        return count + (len(self._extra) if self._extra else 0)
+    
+    def __contains__(self, key) -> bool:
+        if key in AnalysisResult.FIELDS:
+            return getattr(self, '_' + key) is not _MISSING
+        return self._extra is not None and key in self._extra
+    
+    def __repr__(self) -> str:
+        return f"AnalysisResult({self.to_dict()!r})"
+    
+    def __copy__(self) -> 'AnalysisResult':
+        clone = AnalysisResult.__new__(AnalysisResult)
+        for slot in self.__slots__:
+            setattr(clone, slot, getattr(self, slot))
+        # Everything else is immutable; these two are the only shared mutable parts
+        if isinstance(self._errors, dict):
+            clone._errors = dict(self._errors)
+        if self._extra is not None:
+            clone._extra = dict(self._extra)
+        return clone
+    
+    def __deepcopy__(self, memo) -> 'AnalysisResult':
+        clone = self.__copy__()
+        if clone._extra is not None:
+            clone._extra = copy.deepcopy(clone._extra, memo)
+        return clone
+    
+    def copy(self) -> 'AnalysisResult':
+        """Shallow copy, like dict.copy()"""
+        return self.__copy__()
+    
+    def __reduce__(self):
+        # Pickle (e.g. session state snapshots) through the compact encoding
+        return AnalysisResult.decode, (self.encode(),)
+    
+    # Binary encoding
+    
+    def encode(self) -> bytes:
+        """Compact binary form: a version byte, then one tagged record per present key"""
+        out = bytearray([AnalysisResult.VERSION])
+        for tag, key in enumerate(AnalysisResult.FIELDS):
+            value = getattr(self, '_' + key)
+            if value is _MISSING:
+                continue
+            if value is None:
+                out.append(tag | AnalysisResult._NONE_FLAG)
+                continue
+            out.append(tag)
+            getattr(self, f'_encode_{key}')(out, value)
+        if self._extra:
+            out.append(AnalysisResult._EXTRA_TAG)
+            self._write_str(out, json.dumps(self._extra, ensure_ascii=False, separators=(',', ':')))
+        return bytes(out)
+    
+    @classmethod
+    def decode(cls, data: bytes) -> 'AnalysisResult':
+        """Rebuild a result from encode() output"""
+        data = memoryview(data)
+        if not data or data[0] != cls.VERSION:
+            raise ValueError(f"Unsupported AnalysisResult encoding version: {data[0] if data else None}")
+        result = cls()
+        position = 1
+        while position < len(data):
+            tag = data[position]
+            position += 1
+            field = tag & ~cls._NONE_FLAG
+            if field == cls._EXTRA_TAG:
+                extra, position = cls._read_str(data, position)
+                result._extra = json.loads(extra)
+                continue
+            if field >= len(cls.FIELDS):
+                raise ValueError(f"Unknown AnalysisResult field tag: {tag}")
+            key = cls.FIELDS[field]
+            if tag & cls._NONE_FLAG:
+                setattr(result, '_' + key, None)
+                continue
+            value, position = getattr(cls, f'_decode_{key}')(data, position)
+            setattr(result, '_' + key, value)
+        return result
+    
+    # Per-field conversions between the dict shape (unpack) and the slot value (pack)
+    
+    @staticmethod
+    def _pack_sentiment(value: Mapping) -> Tuple:
+        scores = value['scores']
+        return (value['label'],) + tuple(float(scores.get(name, 0.0)) for name in AnalysisResult.SCORE_NAMES)
+    
+    @staticmethod
+    def _unpack_sentiment(value: Tuple) -> Dict:
+        return {'label': value[0], 'scores': dict(zip(AnalysisResult.SCORE_NAMES, value[1:]))}
+    
+    @staticmethod
+    def _pack_key_phrases(value) -> Tuple[str, ...]:
+        return tuple(value)
+    
+    @staticmethod
+    def _unpack_key_phrases(value: Tuple) -> list:
+        return list(value)
+    
+    @staticmethod
+    def _pack_entities(value) -> Tuple:
+        return tuple((text, category, float(confidence)) for text, category, confidence in value)
+    
+    @staticmethod
+    def _unpack_entities(value: Tuple) -> list:
+        return list(value)
+    
+    @staticmethod
+    def _pack_language(value: Mapping) -> Tuple[str, str, float]:
+        return value['name'], value['code'], float(value['confidence'])
+    
+    @staticmethod
+    def _unpack_language(value: Tuple) -> Dict:
+        return {'name': value[0], 'code': value[1], 'confidence': value[2]}
+    
+    @staticmethod
+    def _pack_pii_entities(value) -> Tuple:
+        return tuple((text, category) for text, category in value)
+    
+    @staticmethod
+    def _unpack_pii_entities(value: Tuple) -> list:
+        return list(value)
+    
+    @staticmethod
+    def _pack_errors(value: Mapping) -> Dict[str, str]:
+        # Kept as the caller's dict so result.setdefault('errors', {})[feature] = ... works
+        return value if isinstance(value, dict) else dict(value)
+    
+    @staticmethod
+    def _unpack_errors(value: Dict) -> Dict[str, str]:
+        return value
+    
+    @staticmethod
+    def _pack_degraded(value) -> bool:
+        return bool(value)
+    
+    @staticmethod
+    def _unpack_degraded(value: bool) -> bool:
+        return value
+    
+    # Per-field binary encoders and decoders; decoders return (value, next position)
+    
+    @classmethod
+    def _encode_sentiment(cls, out: bytearray, value: Tuple):
+        label = value[0]
+        if label in cls.SENTIMENT_LABELS:
+            out.append(cls.SENTIMENT_LABELS.index(label))
+        else:
+            out.append(0xFF)
+            cls._write_str(out, label)
+        for score in value[1:]:
+            out += _DOUBLE.pack(score)
+    
+    @classmethod
+    def _decode_sentiment(cls, data: memoryview, position: int):
+        code = data[position]
+        position += 1
+        if code == 0xFF:
+            label, position = cls._read_str(data, position)
+        else:
+            label = cls.SENTIMENT_LABELS[code]
+        scores = struct.unpack_from('<3d', data, position)
+        return (label,) + scores, position + 24
+    
+    @classmethod
+    def _encode_key_phrases(cls, out: bytearray, value: Tuple):
+        cls._write_varint(out, len(value))
+        for phrase in value:
+            cls._write_str(out, phrase)
+    
+    @classmethod
+    def _decode_key_phrases(cls, data: memoryview, position: int):
+        count, position = cls._read_varint(data, position)
+        phrases = []
+        for _ in range(count):
+            phrase, position = cls._read_str(data, position)
+            phrases.append(phrase)
+        return tuple(phrases), position
+    
+    @classmethod
+    def _encode_entities(cls, out: bytearray, value: Tuple):
+        cls._write_varint(out, len(value))
+        for text, category, confidence in value:
+            cls._write_str(out, text)
+            cls._write_str(out, category)
+            out += _DOUBLE.pack(confidence)
+    
+    @classmethod
+    def _decode_entities(cls, data: memoryview, position: int):
+        count, position = cls._read_varint(data, position)
+        entities = []
+        for _ in range(count):
+            text, position = cls._read_str(data, position)
+            category, position = cls._read_str(data, position)
+            confidence, = _DOUBLE.unpack_from(data, position)
+            position += 8
+            entities.append((text, category, confidence))
+        return tuple(entities), position
+    
+    @classmethod
+    def _encode_language(cls, out: bytearray, value: Tuple):
+        cls._write_str(out, value[0])
+        cls._write_str(out, value[1])
+        out += _DOUBLE.pack(value[2])
+    
+    @classmethod
+    def _decode_language(cls, data: memoryview, position: int):
+        name, position = cls._read_str(data, position)
+        code, position = cls._read_str(data, position)
+        confidence, = _DOUBLE.unpack_from(data, position)
+        return (name, code, confidence), position + 8
+    
+    @classmethod
+    def _encode_pii_entities(cls, out: bytearray, value: Tuple):
+        cls._write_varint(out, len(value))
+        for text, category in value:
+            cls._write_str(out, text)
+            cls._write_str(out, category)
+    
+    @classmethod
+    def _decode_pii_entities(cls, data: memoryview, position: int):
+        count, position = cls._read_varint(data, position)
+        entities = []
+        for _ in range(count):
+            text, position = cls._read_str(data, position)
+            category, position = cls._read_str(data, position)
+            entities.append((text, category))
+        return tuple(entities), position
+    
+    @classmethod
+    def _encode_errors(cls, out: bytearray, value: Dict[str, str]):
+        cls._write_varint(out, len(value))
+        for feature, message in value.items():
+            cls._write_str(out, feature)
+            cls._write_str(out, message)
+    
+    @classmethod
+    def _decode_errors(cls, data: memoryview, position: int):
+        count, position = cls._read_varint(data, position)
+        errors = {}
+        for _ in range(count):
+            feature, position = cls._read_str(data, position)
+            errors[feature], position = cls._read_str(data, position)
+        return errors, position
+    
+    @staticmethod
+    def _encode_degraded(out: bytearray, value: bool):
+        out.append(1 if value else 0)
+    
+    @staticmethod
+    def _decode_degraded(data: memoryview, position: int):
+        return bool(data[position]), position + 1
+    
+    # Primitives: unsigned LEB128 varints and length-prefixed UTF-8 strings
+    
+    @staticmethod
+    def _write_varint(out: bytearray, number: int):
+        while number >= 0x80:
+            out.append((number & 0x7F) | 0x80)
+            number >>= 7
+        out.append(number)
+    
+    @staticmethod
+    def _read_varint(data: memoryview, position: int) -> Tuple[int, int]:
+        number = shift = 0
+        while True:
+            byte = data[position]
+            position += 1
+            number |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return number, position
+            shift += 7
+    
+    @classmethod
+    def _write_str(cls, out: bytearray, text: str):
+        encoded = str(text).encode('utf-8')
+        cls._write_varint(out, len(encoded))
+        out += encoded
+    
+    @classmethod
+    def _read_str(cls, data: memoryview, position: int) -> Tuple[str, int]:
+        length, position = cls._read_varint(data, position)
+        end = position + length
+        return str(data[position:end], 'utf-8'), end
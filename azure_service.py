@@ -1,41 +1,373 @@
-from azure.ai.textanalytics import TextAnalyticsClient
-from azure.core.credentials import AzureKeyCredential
+from azure.ai.textanalytics import (
+    AnalyzeSentimentAction,
+    ExtractKeyPhrasesAction,
+    RecognizeEntitiesAction,
+    RecognizePiiEntitiesAction
+)
 from azure.core.exceptions import AzureError
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, Iterable, List, Tuple, Optional
+import asyncio
 import logging
+import threading
+import time
 from config import AzureConfig
+from client_factory import ClientFactory
+from result_cache import ResultCache
+from rate_limit import RateLimiter
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from resource_pool import PoolMember, ResourcePool
+from local_analyzer import LocalTextAnalyzer
+from text_chunker import TextChunker
+from single_flight import SingleFlight
+from hedging import RequestHedger
+from metrics import MetricsRegistry
+from analysis_result import AnalysisResult
 
 logger = logging.getLogger(__name__)
 
 class AzureTextAnalyzer:
     """Azure AI Language Service"""
     
-    def __init__(self, config: AzureConfig):
-        self.client = TextAnalyticsClient(
-            endpoint=config.endpoint,
-            credential=AzureKeyCredential(config.key)
+    # Result key -> (client method, formatter) for every analysis we run
+    FEATURES = {
+        'sentiment': ('analyze_sentiment', '_format_sentiment'),
+        'key_phrases': ('extract_key_phrases', '_format_key_phrases'),
+        'entities': ('recognize_entities', '_format_entities'),
+        'language': ('detect_language', '_format_language'),
+        'pii_entities': ('recognize_pii_entities', '_format_pii')
+    }
+    
+    # Maximum documents per request the service accepts for each feature
+    BATCH_LIMITS = {
+        'sentiment': 10,
+        'key_phrases': 10,
+        'entities': 5,
+        'language': 1000,
+        'pii_entities': 5
+    }
+    
+    # Features an analyze-actions job can compute - language detection is not an action
+    ACTIONS = {
+        'sentiment': AnalyzeSentimentAction,
+        'key_phrases': ExtractKeyPhrasesAction,
+        'entities': RecognizeEntitiesAction,
+        'pii_entities': RecognizePiiEntitiesAction
+    }
+    
+    # Seconds between status checks on an analyze-actions job
+    ACTIONS_POLLING_INTERVAL = 1
+    # How long to wait for a multi-action job when the config sets no timeout
+    ACTIONS_TIMEOUT = 30.0
+    
+    # 'sequential' calls each feature in turn, 'concurrent' sends them all at once,
+    # 'actions' submits one multi-action job
+    MODES = ('sequential', 'concurrent', 'actions')
+    
+    def __init__(self, config: AzureConfig, mode: str = 'sequential',
+                 cache: Optional[ResultCache] = None, rate_limiter: Optional[RateLimiter] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 client_factory: Optional[ClientFactory] = None, hedger: Optional[RequestHedger] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown analysis mode: {mode}")
+        
+        # The async client lives on its own loop thread so sync callers can share it
+        self._loop = _EventLoopThread() if mode == 'concurrent' else None
+        
+        # One member per configured resource; calls go to the least loaded healthy one
+        self.client_factory = client_factory or ClientFactory.default()
+        client_options = self.client_options(config, rate_limiter)
+        members = []
+        for endpoint, key in config.resources:
+            client = self.client_factory.client(endpoint, key, **client_options)
+            async_client = None
+            if mode == 'concurrent':
+                async_client = self.client_factory.async_client(endpoint, key, loop=self._loop.loop,
+                                                                **client_options)
+            members.append(PoolMember(endpoint, client, async_client))
+        # Each resource gets an equal share of the limiter's rate as its own quota
+        self.pool = ResourcePool(
+            members,
+            probe=self._health_check,
+            requests_per_minute=rate_limiter.requests_per_minute / len(members) if rate_limiter else None
         )
+        self.mode = mode
+        self.timeout = config.timeout
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.hedger = hedger
         self.logger = logger
+        
+        # Identical analyses requested at the same time (double clicks, several tabs) share one call
+        self.single_flight = SingleFlight()
+        
+        # While the breaker is open we answer from the local lexicon instead
+        self._local = LocalTextAnalyzer()
+        if circuit_breaker and circuit_breaker.probe is None:
+            circuit_breaker.probe = lambda: self.pool.call(self._health_check)
+        
+        self._async_analyzer = None
+        if mode == 'concurrent':
+            self._async_analyzer = AsyncAzureTextAnalyzer(config, rate_limiter, circuit_breaker, self.pool,
+                                                          self.client_factory, hedger)
     
-    def analyze_text_comprehensive(self, text: str) -> Dict:
-        """Run all available Azure AI analysis on the text"""
+    def analyze_text_comprehensive(self, text: str, features: Optional[Iterable[str]] = None) -> AnalysisResult:
+        """Run Azure AI analysis on the text - every feature unless a subset is given"""
         if not text.strip():
             raise ValueError("Text cannot be empty")
+        features = self.resolve_features(features)
+        key = ResultCache.make_key(text, features)
+        with MetricsRegistry.default().timer('analyze_text'):
+            return self.single_flight.do(key, lambda: self._analyze_cached(text, features, key))
+    
+    def _analyze_cached(self, text: str, features: List[str], cache_key: str) -> AnalysisResult:
+        """Serve from the cache if possible, otherwise analyze and fill the cache"""
+        if self.cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.logger.info("Served analysis from cache")
+                return cached
         
-        results = {
-            'sentiment': self._get_sentiment(text),
-            'key_phrases': self._get_key_phrases(text),
-            'entities': self._get_entities(text),
-            'language': self._detect_language(text),
-            'pii_entities': self._get_pii(text)
-        }
+        try:
+            results = AnalysisResult.from_dict(self._analyze(text, features))
+        except CircuitOpenError:
+            return self.degraded_analysis(text, features)
+        if self.cache:
+            self.cache.set(cache_key, results)
+        return results
+    
+    def degraded_analysis(self, text: str, features: Optional[Iterable[str]] = None) -> AnalysisResult:
+        """Local sentiment and keyword results, used while Azure is failing or too slow.
+        
+        Features the local lexicon can't compute are left out and the result is
+        flagged with 'degraded' so callers can say so.
+        """
+        results = self._local.analyze_text_comprehensive(text, self.resolve_features(features))
+        results['degraded'] = True
+        self.logger.warning("Azure circuit is open, served local analysis")
+        return results
+    
+    @staticmethod
+    def client_options(config: AzureConfig, rate_limiter: Optional[RateLimiter] = None) -> Dict:
+        """Keyword arguments for ClientFactory shared by the sync and async clients"""
+        options = {'timeout': config.timeout}
+        if rate_limiter:
+            # Our limiter does the retrying, so the SDK's retries would only multiply it
+            options['retry_total'] = 0
+        return options
+    
+    @classmethod
+    def resolve_features(cls, features: Optional[Iterable[str]] = None) -> List[str]:
+        """Validate a feature selection and put it in FEATURES order"""
+        if features is None:
+            return list(cls.FEATURES)
+        
+        requested = set(features)
+        unknown = requested - set(cls.FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown analysis features: {', '.join(sorted(unknown))}")
+        return [feature for feature in cls.FEATURES if feature in requested]
+    
+    def _analyze(self, text: str, features: List[str]) -> Dict:
+        """Call Azure using the configured mode"""
+        if len(text) > TextChunker.MAX_DOCUMENT_CHARS:
+            return self._analyze_long(text, features)
+        if self.mode == 'concurrent':
+            return self._loop.run(self._async_analyzer.analyze_text_comprehensive(text, features))
+        if self.mode == 'actions':
+            return self._analyze_with_actions(text, features)
+        
+        results = {feature: self._get_feature(feature, text) for feature in features}
         
         self.logger.info(f"Analyzed text with {len(results)} features")
         return results
     
-    def _get_sentiment(self, text: str) -> Dict:
-        """Get sentiment analysis results"""
-        result = self.client.analyze_sentiment(documents=[text])[0]
+    def analyze_texts_batch(self, texts: List[str], features: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Run Azure AI analysis on many texts using batched requests.
+        
+        Results keep the input order and the same shape as analyze_text_comprehensive.
+        A feature that failed for one document is set to None and its message is
+        stored under that document's 'errors' dict instead of failing the batch.
+        """
+        features = self.resolve_features(features)
+        
+        # Texts over the service's document limit go out as several sentence-aligned chunks
+        if any(text and len(text) > TextChunker.MAX_DOCUMENT_CHARS for text in texts):
+            documents, spans = [], []
+            for text in texts:
+                chunks = TextChunker.chunk(text) if text and len(text) > TextChunker.MAX_DOCUMENT_CHARS else [text]
+                spans.append((len(documents), chunks))
+                documents.extend(chunks)
+            results = self.analyze_texts_batch(documents, features)
+            return [
+                results[start] if len(chunks) == 1 else
+                TextChunker.merge(results[start:start + len(chunks)], chunks, features)
+                for start, chunks in spans
+            ]
+        
+        results = [dict.fromkeys(features) for _ in texts]
+        valid = []
+        for i, text in enumerate(texts):
+            if text and text.strip():
+                valid.append(i)
+            else:
+                for feature in features:
+                    self._set_error(results[i], feature, "Text cannot be empty")
+        
+        for feature in features:
+            method, formatter = self.FEATURES[feature]
+            limit = self.BATCH_LIMITS[feature]
+            for start in range(0, len(valid), limit):
+                indices = valid[start:start + limit]
+                try:
+                    response = self._call(method, [texts[i] for i in indices])
+                except AzureError as e:
+                    # The whole request failed, so every document in it gets the error
+                    self.logger.error(f"Batch {feature} request failed: {e}")
+                    for i in indices:
+                        self._set_error(results[i], feature, str(e))
+                    continue
+                
+                for i, doc in zip(indices, response):
+                    if doc.is_error:
+                        self._set_error(results[i], feature, doc.error.message)
+                    else:
+                        results[i][feature] = getattr(self, formatter)(doc)
+        
+        self.logger.info(f"Analyzed {len(texts)} texts in batches")
+        return results
+    
+    def _analyze_long(self, text: str, features: List[str]) -> Dict:
+        """Analyze text over the document limit as one batch of chunks"""
+        results = self.analyze_texts_batch([text], features)[0]
+        errors = results.pop('errors', {})
+        if errors:
+            if self.circuit_breaker and self.circuit_breaker.is_open:
+                raise CircuitOpenError("Azure calls are paused while the service recovers")
+            feature, message = next(iter(errors.items()))
+            raise AzureError(f"Azure could not compute {feature}: {message}")
+        
+        self.logger.info(f"Analyzed long text ({len(text)} characters) in chunks")
+        return results
+    
+    def _analyze_with_actions(self, text: str, features: List[str]) -> Dict:
+        """Run the analysis as one multi-action job plus a language detection call"""
+        action_features = [feature for feature in features if feature in self.ACTIONS]
+        poller = None
+        if action_features:
+            poller = self._call(
+                'begin_analyze_actions',
+                [text],
+                actions=[self.ACTIONS[feature]() for feature in action_features],
+                polling_interval=self.ACTIONS_POLLING_INTERVAL
+            )
+        
+        # Language isn't available as an action, so detect it while the job runs
+        formatted = {}
+        if 'language' in features:
+            formatted['language'] = self._get_feature('language', text)
+        
+        if poller:
+            wait = lambda: self._wait_for_job(poller)
+            if self.circuit_breaker:
+                unguarded = wait
+                wait = lambda: self.circuit_breaker.call(unguarded)
+            action_results = next(iter(wait()))
+            for feature, action_result in zip(action_features, action_results):
+                if action_result.is_error:
+                    raise AzureError(f"Azure could not compute {feature}: {action_result.error.message}")
+                formatted[feature] = getattr(self, self.FEATURES[feature][1])(action_result)
+        
+        results = {feature: formatted[feature] for feature in features}
+        self.logger.info(f"Analyzed text with {len(results)} features in one job")
+        return results
+    
+    def _wait_for_job(self, poller):
+        """Wait for a multi-action job, charging each status poll to the rate limiter.
+        
+        The SDK polls on its own thread, so the polls can't be held back. They are
+        charged one per polling interval so other calls wait for the quota they
+        used. A job still running after the timeout is cancelled and raises an AzureError.
+        """
+        timeout = self.timeout or self.ACTIONS_TIMEOUT
+        deadline = time.monotonic() + timeout
+        with MetricsRegistry.default().timer('azure.analyze_actions_job'):
+            while not poller.done():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    try:
+                        poller.cancel()
+                    except Exception as e:
+                        self.logger.warning(f"Could not cancel the timed-out analysis job: {e}")
+                    raise AzureError(f"Analysis job did not finish within {timeout:g}s")
+                poller.wait(min(self.ACTIONS_POLLING_INTERVAL, remaining))
+                if self.rate_limiter:
+                    self.rate_limiter.charge()
+        return poller.result()
+    
+    def close(self):
+        """Close the underlying clients"""
+        for member in self.pool.members:
+            member.client.close()
+        if self._loop:
+            self._loop.run(self._async_analyzer.close())
+            self._loop.stop()
+    
+    @staticmethod
+    def _set_error(result: Dict, feature: str, message: str):
+        """Mark one feature as failed for a single document"""
+        result[feature] = None
+        result.setdefault('errors', {})[feature] = message
+    
+    def _get_feature(self, feature: str, text: str):
+        """Run one analysis feature on a single text"""
+        method, formatter = self.FEATURES[feature]
+        result = self._call(method, [text])[0]
+        return getattr(self, formatter)(result)
+    
+    def _call(self, method: str, documents: List[str], **kwargs):
+        """Make one request with the sync client, rate limited and retried if configured"""
+        def send(member):
+            # Network plus SDK time for one attempt, without rate limit waits
+            with MetricsRegistry.default().timer(f'azure.{method}'):
+                return getattr(member.client, method)(documents=documents, **kwargs)
+        if self.hedger and method != 'begin_analyze_actions':
+            # A hedge goes to a different resource than the attempt it duplicates, if there is one
+            request = lambda: self.hedger.call(method, self._attempts(self.pool.call, send),
+                                               self._hedge_admission(self.rate_limiter, len(documents)))
+        else:
+            request = lambda: self.pool.call(send)
+        if self.circuit_breaker:
+            self.circuit_breaker.check()
+            unguarded = request
+            request = lambda: self.circuit_breaker.call(unguarded)
+        if self.rate_limiter:
+            return self.rate_limiter.call(request, documents=len(documents))
+        return request()
+    
+    @staticmethod
+    def _attempts(call: Callable, send: Callable) -> Callable:
+        """A function making one pool call per invocation, each avoiding members already used"""
+        used = []
+        def attempt():
+            return call(lambda member: used.append(member) or send(member), avoid=list(used))
+        return attempt
+    
+    @staticmethod
+    def _hedge_admission(rate_limiter: Optional[RateLimiter], documents: int = 1) -> Optional[Callable[[], bool]]:
+        """Makes a hedge spend its own rate limit token, skipping it when none is free"""
+        if rate_limiter is None:
+            return None
+        return lambda: rate_limiter.try_acquire(documents)
+    
+    @staticmethod
+    def _health_check(member: PoolMember):
+        """Cheapest possible request, used to probe a resource that has been failing"""
+        member.client.detect_language(documents=["health check"])
+    
+    @staticmethod
+    def _format_sentiment(result) -> Dict:
+        """Convert a sentiment document result to our dict shape"""
         return {
             'label': result.sentiment,
             'scores': {
@@ -45,27 +377,107 @@ class AzureTextAnalyzer:
             }
         }
     
-    def _get_key_phrases(self, text: str) -> List[str]:
-        """Extract key phrases"""
-        result = self.client.extract_key_phrases(documents=[text])[0]
+    @staticmethod
+    def _format_key_phrases(result) -> List[str]:
+        """Convert a key phrase document result to a list of phrases"""
         return result.key_phrases
     
-    def _get_entities(self, text: str) -> List[Tuple[str, str, float]]:
-        """Get named entities with confidence scores"""
-        result = self.client.recognize_entities(documents=[text])[0]
+    @staticmethod
+    def _format_entities(result) -> List[Tuple[str, str, float]]:
+        """Convert an entity document result to (text, category, confidence) tuples"""
         return [(entity.text, entity.category, entity.confidence_score) 
                 for entity in result.entities]
     
-    def _detect_language(self, text: str) -> Dict:
-        """Detect the language of the text"""
-        result = self.client.detect_language(documents=[text])[0]
+    @staticmethod
+    def _format_language(result) -> Dict:
+        """Convert a language document result to our dict shape"""
         return {
             'name': result.primary_language.name,
             'code': result.primary_language.iso6391_name,
             'confidence': result.primary_language.confidence_score
         }
     
-    def _get_pii(self, text: str) -> List[Tuple[str, str]]:
-        """Find personally identifiable information"""
-        result = self.client.recognize_pii_entities(documents=[text])[0]
-        return [(entity.text, entity.category) for entity in result.entities]
\ No newline at end of file
+    @staticmethod
+    def _format_pii(result) -> List[Tuple[str, str]]:
+        """Convert a PII document result to (text, category) tuples"""
+        return [(entity.text, entity.category) for entity in result.entities]
+
+class AsyncAzureTextAnalyzer:
+    """Azure AI Language Service over the async client - all features run concurrently"""
+    
+    def __init__(self, config: AzureConfig, rate_limiter: Optional[RateLimiter] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None, pool: Optional[ResourcePool] = None,
+                 client_factory: Optional[ClientFactory] = None, hedger: Optional[RequestHedger] = None,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.client_factory = client_factory or ClientFactory.default()
+        # A pool shared with the sync analyzer keeps one view of each resource's load and health
+        if pool is None:
+            client_options = AzureTextAnalyzer.client_options(config, rate_limiter)
+            pool = ResourcePool([
+                PoolMember(endpoint, async_client=self.client_factory.async_client(endpoint, key, loop=loop,
+                                                                                   **client_options))
+                for endpoint, key in config.resources
+            ])
+        self.pool = pool
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.hedger = hedger
+        self.logger = logger
+    
+    async def analyze_text_comprehensive(self, text: str, features: Optional[Iterable[str]] = None) -> AnalysisResult:
+        """Run Azure AI analysis on the text, waiting only for the slowest call"""
+        if not text.strip():
+            raise ValueError("Text cannot be empty")
+        
+        features = AzureTextAnalyzer.resolve_features(features)
+        values = await asyncio.gather(*(self._analyze(feature, text) for feature in features))
+        results = AnalysisResult(zip(features, values))
+        
+        self.logger.info(f"Analyzed text with {len(results)} features concurrently")
+        return results
+    
+    async def _analyze(self, feature: str, text: str):
+        """Run a single feature and format it like the sync analyzer does"""
+        method, formatter = AzureTextAnalyzer.FEATURES[feature]
+        async def send(member):
+            with MetricsRegistry.default().timer(f'azure.{method}'):
+                return await getattr(member.async_client, method)(documents=[text])
+        if self.hedger:
+            request = lambda: self.hedger.acall(method, AzureTextAnalyzer._attempts(self.pool.acall, send),
+                                                AzureTextAnalyzer._hedge_admission(self.rate_limiter))
+        else:
+            request = lambda: self.pool.acall(send)
+        if self.circuit_breaker:
+            self.circuit_breaker.check()
+            unguarded = request
+            request = lambda: self.circuit_breaker.acall(unguarded)
+        if self.rate_limiter:
+            response = await self.rate_limiter.acall(request)
+        else:
+            response = await request()
+        return getattr(AzureTextAnalyzer, formatter)(response[0])
+    
+    async def close(self):
+        """Close the async clients and their connection pools"""
+        for member in self.pool.members:
+            await member.async_client.close()
+        # Only this loop's aiohttp session; analyzers on other loops keep theirs
+        await self.client_factory.aclose()
+
+
+class _EventLoopThread:
+    """Long-lived event loop on a daemon thread for running coroutines from sync code"""
+    
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="azure-aio-loop", daemon=True)
+        self._thread.start()
+    
+    def run(self, coro):
+        """Run a coroutine on the loop and block until it finishes"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+    
+    def stop(self):
+        """Stop the loop and wait for its thread to exit"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
\ No newline at end of file
@@ -0,0 +1,186 @@
+import platform
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+from emotion_analyzer import EmotionAnalyzer
+from metrics import LatencyHistogram
+from recommend import RecommendationEngine
+
+logger = logging.getLogger(__name__)
+
+class BenchmarkSuite:
+    """Throughput and p50/p99 latency of analysis, emotion scoring and recommendations.
+    
+    Every stage runs in three modes: 'single' (one item per call, one caller),
+    'batch' (batch_size items per call) and 'concurrent' (one item per call from
+    `concurrency` threads). Run it against MockLanguageServer for repeatable
+    numbers or against a real resource to see what users get.
+    """
+    
+    MODES = ('single', 'batch', 'concurrent')
+    STAGES = ('analyze', 'emotion', 'recommend')
+    
+    # Journal-style entries used when no input texts are given
+    SAMPLE_TEXTS = [
+        "I finally got the promotion I've been working towards all year and I'm thrilled!",
+        "Work was exhausting today and I feel overwhelmed by everything on my plate.",
+        "My flight got cancelled again and nobody at the desk could tell us anything. Furious.",
+        "Had a quiet walk in the park with Sam, the weather was lovely and calm.",
+        "I keep worrying about the exam results, I can't sleep and my heart is racing.",
+        "The leftovers in the fridge smelled awful, honestly disgusting.",
+        "Nothing special happened, just a normal Tuesday of meetings and emails.",
+        "I miss my grandmother so much, the house feels empty without her.",
+        "Wow, I did not expect the surprise party at all! Everyone was there.",
+        "Mixed feelings: the new job is exciting but I'm sad to leave my old team behind."
+    ]
+    
+    def __init__(self, analyzer, texts: Optional[List[str]] = None, iterations: int = 100,
+                 batch_size: int = 10, concurrency: int = 8, rec_type: str = 'songs'):
+        self.analyzer = analyzer
+        self.texts = [text for text in (texts or self.SAMPLE_TEXTS) if text.strip()]
+        self.iterations = iterations
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.rec_type = rec_type
+        self.logger = logger
+        self._results = None
+    
+    def run(self, scenarios: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """Run the chosen scenarios ('stage.mode', all by default) and return their measurements"""
+        names = list(scenarios) if scenarios else [f"{stage}.{mode}" for stage in self.STAGES for mode in self.MODES]
+        unknown = [name for name in names if name.partition('.')[0] not in self.STAGES or
+                   name.partition('.')[2] not in self.MODES]
+        if unknown:
+            raise ValueError(f"Unknown benchmark scenarios: {', '.join(unknown)}")
+        
+        if any(name.startswith('emotion.') for name in names):
+            # Fetch the inputs up front so the concurrent threads don't race to do it
+            self._analysis_results()
+        
+        report = {}
+        for name in names:
+            stage, _, mode = name.partition('.')
+            operation = getattr(self, f'_{stage}_{"batch" if mode == "batch" else "one"}')
+            self.logger.info(f"Running benchmark {name}")
+            report[name] = self._measure(mode, operation)
+        return report
+    
+    @staticmethod
+    def environment() -> Dict[str, str]:
+        """Where the numbers were measured, to store next to them"""
+        return {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine()
+        }
+    
+    @staticmethod
+    def compare(baseline: Dict[str, Dict], current: Dict[str, Dict], tolerance: float = 0.2) -> List[str]:
+        """Scenarios whose p99 grew or throughput fell by more than `tolerance` against a baseline"""
+        regressions = []
+        for name, now in current.items():
+            before = baseline.get(name)
+            if not before:
+                continue
+            if before['p99_ms'] > 0 and now['p99_ms'] > before['p99_ms'] * (1 + tolerance):
+                regressions.append(f"{name}: p99 {before['p99_ms']:.2f}ms -> {now['p99_ms']:.2f}ms")
+            if now['throughput'] < before['throughput'] * (1 - tolerance):
+                regressions.append(f"{name}: throughput {before['throughput']:.1f}/s -> {now['throughput']:.1f}/s")
+        return regressions
+    
+    def _measure(self, mode: str, operation: Callable[[int], Tuple[int, int]]) -> Dict:
+        """Call operation(i) `iterations` times in the given mode and summarize the timings"""
+        histogram = LatencyHistogram(window=self.iterations)
+        lock = threading.Lock()
+        
+        def timed(index: int) -> Tuple[int, int]:
+            started = time.perf_counter()
+            try:
+                items, errors = operation(index)
+            except Exception as e:
+                self.logger.warning(f"Benchmark call failed: {e}")
+                items, errors = 1, 1
+            elapsed = time.perf_counter() - started
+            with lock:
+                histogram.observe(elapsed, error=errors > 0)
+            return items, errors
+        
+        started = time.perf_counter()
+        if mode == 'concurrent':
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                outcomes = list(executor.map(timed, range(self.iterations)))
+        else:
+            outcomes = [timed(index) for index in range(self.iterations)]
+        elapsed = time.perf_counter() - started
+        
+        items = sum(outcome[0] for outcome in outcomes)
+        quantiles = histogram.quantiles()
+        return {
+            'mode': mode,
+            'calls': self.iterations,
+            'items': items,
+            'errors': sum(outcome[1] for outcome in outcomes),
+            'seconds': elapsed,
+            'throughput': items / elapsed if elapsed > 0 else 0.0,
+            'p50_ms': quantiles[0.5] * 1000,
+            'p99_ms': quantiles[0.99] * 1000
+        }
+    
+    def _text(self, index: int) -> str:
+        """The index-th input text, made unique once the inputs run out.
+        
+        Repeats would otherwise be shared with an identical call in flight
+        instead of measuring a real request.
+        """
+        text = self.texts[index % len(self.texts)]
+        return text if index < len(self.texts) else f"{text} ({index})"
+    
+    def _batch(self, index: int) -> range:
+        """Item indexes making up the index-th batch"""
+        return range(index * self.batch_size, (index + 1) * self.batch_size)
+    
+    def _analysis_results(self) -> List[Dict]:
+        """Analysis results to score emotions on, computed once and not timed"""
+        if self._results is None:
+            self._results = []
+            for start in range(0, len(self.texts), self.batch_size):
+                self._results.extend(self.analyzer.analyze_texts_batch(self.texts[start:start + self.batch_size]))
+        return self._results
+    
+    def _emotion(self, index: int) -> str:
+        """Emotion to ask recommendations for, cycling through every known emotion"""
+        emotions = RecommendationEngine.get_available_emotions()
+        return emotions[index % len(emotions)]
+    
+    # Operations: each handles call number `index` and returns (items, items that failed)
+    
+    def _analyze_one(self, index: int) -> Tuple[int, int]:
+        result = self.analyzer.analyze_text_comprehensive(self._text(index))
+        return 1, int('errors' in result)
+    
+    def _analyze_batch(self, index: int) -> Tuple[int, int]:
+        results = self.analyzer.analyze_texts_batch([self._text(i) for i in self._batch(index)])
+        return len(results), sum('errors' in result for result in results)
+    
+    def _emotion_one(self, index: int) -> Tuple[int, int]:
+        results = self._analysis_results()
+        EmotionAnalyzer.analyze_emotions(results[index % len(results)])
+        return 1, 0
+    
+    def _emotion_batch(self, index: int) -> Tuple[int, int]:
+        results = self._analysis_results()
+        batch = [results[i % len(results)] for i in self._batch(index)]
+        EmotionAnalyzer.analyze_emotions_batch(batch)
+        return len(batch), 0
+    
+    def _recommend_one(self, index: int) -> Tuple[int, int]:
+        RecommendationEngine.get_recommendation(self._emotion(index), self.rec_type)
+        return 1, 0
+    
+    def _recommend_batch(self, index: int) -> Tuple[int, int]:
+        for i in self._batch(index):
+            RecommendationEngine.get_all_recommendations(self._emotion(i))
+        return self.batch_size, 0
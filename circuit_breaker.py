@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+import logging
+from azure.core.exceptions import AzureError, HttpResponseError
+from metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpenError(AzureError):
+    """Raised instead of calling Azure while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Stops calling Azure when recent calls fail too often or get too slow.
+    
+    Trips when the last `window` calls have an error rate or p95 latency over the
+    thresholds; the latency check also needs `min_slow_calls` calls over the
+    threshold, so a single outlier in a short window can't trip it. Throttling
+    (429) is left to the rate limiter and doesn't count as an error. While open,
+    calls fail fast with CircuitOpenError and a background thread runs `probe`
+    every `cooldown` seconds until one succeeds quickly enough.
+    """
+    
+    def __init__(self, error_rate_threshold: float = 0.5, latency_threshold: float = 3.0,
+                 window: int = 20, min_calls: int = 5, min_slow_calls: int = 2,
+                 cooldown: float = 15.0, probe: Optional[Callable] = None):
+        self.error_rate_threshold = error_rate_threshold
+        self.latency_threshold = latency_threshold
+        self.min_calls = min_calls
+        self.min_slow_calls = min_slow_calls
+        self.cooldown = cooldown
+        self.probe = probe
+        self.logger = logger
+        
+        self._calls = deque(maxlen=window)  # (latency_seconds, succeeded)
+        self._open = False
+        self._lock = threading.Lock()
+        self._stats = {'trips': 0, 'rejected': 0, 'probes': 0}
+    
+    @classmethod
+    def from_env(cls) -> 'CircuitBreaker':
+        """Build a breaker from MOODIFY_BREAKER_* environment variables"""
+        return cls(
+            error_rate_threshold=float(os.getenv("MOODIFY_BREAKER_ERROR_RATE", "0.5")),
+            latency_threshold=float(os.getenv("MOODIFY_BREAKER_LATENCY", "3.0")),
+            window=int(os.getenv("MOODIFY_BREAKER_WINDOW", "20")),
+            cooldown=float(os.getenv("MOODIFY_BREAKER_COOLDOWN", "15"))
+        )
+    
+    @property
+    def is_open(self) -> bool:
+        """True while calls are being short-circuited"""
+        return self._open
+    
+    def call(self, func: Callable):
+        """Run a blocking call through the breaker"""
+        self.check()
+        started = time.monotonic()
+        try:
+            result = func()
+        except Exception as e:
+            self.record(time.monotonic() - started, not self.is_service_failure(e))
+            raise
+        self.record(time.monotonic() - started, True)
+        return result
+    
+    async def acall(self, func: Callable):
+        """Async twin of call() for coroutine functions"""
+        self.check()
+        started = time.monotonic()
+        try:
+            result = await func()
+        except Exception as e:
+            self.record(time.monotonic() - started, not self.is_service_failure(e))
+            raise
+        self.record(time.monotonic() - started, True)
+        return result
+    
+    def check(self):
+        """Fail fast if the breaker is open"""
+        if self._open:
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise CircuitOpenError("Azure calls are paused while the service recovers")
+    
+    def record(self, latency: float, succeeded: bool):
+        """Add one call's outcome and trip the breaker if the window looks unhealthy"""
+        with self._lock:
+            if self._open:
+                return
+            self._calls.append((latency, succeeded))
+            if len(self._calls) < self.min_calls:
+                return
+            
+            error_rate = sum(1 for _, ok in self._calls if not ok) / len(self._calls)
+            p95 = self._p95()
+            slow_calls = sum(1 for latency, _ in self._calls if latency >= self.latency_threshold)
+            too_slow = p95 >= self.latency_threshold and slow_calls >= self.min_slow_calls
+            if error_rate < self.error_rate_threshold and not too_slow:
+                return
+            
+            self._open = True
+            self._stats['trips'] += 1
+        self.logger.warning(f"Circuit opened: error rate {error_rate:.0%}, p95 latency {p95:.2f}s")
+        threading.Thread(target=self._probe_until_healthy, name="circuit-probe", daemon=True).start()
+    
+    def stats(self) -> Dict[str, float]:
+        """State, trip/rejection/probe counts and the current window's error rate and p95"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['open'] = self._open
+            stats['error_rate'] = (sum(1 for _, ok in self._calls if not ok) / len(self._calls)
+                                   if self._calls else 0.0)
+            stats['p95_latency'] = self._p95()
+        return stats
+    
+    def _p95(self) -> float:
+        """95th percentile latency of the current window, nearest-rank (lock held)"""
+        if not self._calls:
+            return 0.0
+        return LatencyHistogram.percentile(sorted(latency for latency, _ in self._calls), 0.95)
+    
+    def _probe_until_healthy(self):
+        """Background loop that closes the breaker once the service answers in time"""
+        while True:
+            time.sleep(self.cooldown)
+            if self.probe is None:
+                break
+            
+            with self._lock:
+                self._stats['probes'] += 1
+            started = time.monotonic()
+            try:
+                self.probe()
+            except Exception as e:
+                self.logger.info(f"Circuit probe failed: {e}")
+                continue
+            if time.monotonic() - started < self.latency_threshold:
+                break
+        
+        with self._lock:
+            self._open = False
+            self._calls.clear()
+        self.logger.info("Circuit closed, Azure calls resumed")
+    
+    @staticmethod
+    def is_service_failure(error: Exception) -> bool:
+        """Errors that say the service is unhealthy, as opposed to a bad request or throttling"""
+        if isinstance(error, HttpResponseError) and error.status_code is not None:
+            return error.status_code >= 500
+        return isinstance(error, AzureError)
@@ -0,0 +1,177 @@
+import asyncio
+import os
+import threading
+from typing import Dict, Optional
+import logging
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from azure.ai.textanalytics import TextAnalyticsClient
+from azure.ai.textanalytics.aio import TextAnalyticsClient as AsyncTextAnalyticsClient
+from azure.core.credentials import AzureKeyCredential
+from azure.core.pipeline.transport import AioHttpTransport, RequestsTransport
+
+logger = logging.getLogger(__name__)
+
+class ClientFactory:
+    """Builds Text Analytics clients that share one tuned HTTP connection pool.
+    
+    Every sync client reuses the same requests session and every async client the
+    aiohttp session of its event loop, so warm keep-alive connections (and their
+    TLS sessions) are reused instead of each client paying for its own
+    handshakes. aiohttp sessions can't cross loops, so each loop gets its own.
+    Clients are cached, so asking twice for the same endpoint (and loop) returns
+    the same client.
+    """
+    
+    _default = None
+    _default_lock = threading.Lock()
+    
+    def __init__(self, max_connections: int = 32, keepalive_seconds: float = 30.0):
+        self.max_connections = max_connections
+        self.keepalive_seconds = keepalive_seconds
+        self.logger = logger
+        
+        self._session = requests.Session()
+        self._adapter = HTTPAdapter(pool_connections=8, pool_maxsize=max_connections)
+        self._session.mount('https://', self._adapter)
+        self._session.mount('http://', self._adapter)
+        
+        # aiohttp sessions are bound to the loop they were created in: loop -> session
+        self._aiohttp_sessions = {}
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._async_stats = {'requests': 0, 'connections_opened': 0, 'connections_reused': 0, 'queued': 0}
+    
+    @classmethod
+    def default(cls) -> 'ClientFactory':
+        """Process-wide factory configured from MOODIFY_HTTP_* environment variables"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls(
+                    max_connections=int(os.getenv("MOODIFY_HTTP_MAX_CONNECTIONS", "32")),
+                    keepalive_seconds=float(os.getenv("MOODIFY_HTTP_KEEPALIVE", "30"))
+                )
+            return cls._default
+    
+    def client(self, endpoint: str, key: str, timeout: Optional[float] = None, **options) -> TextAnalyticsClient:
+        """Sync client on the shared requests session"""
+        cache_key = ('sync', endpoint, key, timeout, tuple(sorted(options.items())))
+        with self._lock:
+            if cache_key not in self._clients:
+                transport = RequestsTransport(session=self._session, session_owner=False,
+                                              **self._timeouts(timeout))
+                self._clients[cache_key] = TextAnalyticsClient(
+                    endpoint=endpoint,
+                    credential=AzureKeyCredential(key),
+                    transport=transport,
+                    **options
+                )
+            return self._clients[cache_key]
+    
+    def async_client(self, endpoint: str, key: str, timeout: Optional[float] = None,
+                     loop: Optional[asyncio.AbstractEventLoop] = None, **options) -> AsyncTextAnalyticsClient:
+        """Async client on its loop's shared aiohttp session.
+        
+        Pass the loop the client will run on so clients for different loops are
+        kept apart; clients asked for without one must all be used from the same loop.
+        """
+        cache_key = ('async', loop, endpoint, key, timeout, tuple(sorted(options.items())))
+        with self._lock:
+            if cache_key not in self._clients:
+                transport = _SharedAioHttpTransport(self, **self._timeouts(timeout))
+                self._clients[cache_key] = AsyncTextAnalyticsClient(
+                    endpoint=endpoint,
+                    credential=AzureKeyCredential(key),
+                    transport=transport,
+                    **options
+                )
+            return self._clients[cache_key]
+    
+    def stats(self) -> Dict[str, float]:
+        """Requests sent and connections opened, and the share of requests that reused one"""
+        with self._lock:
+            stats = {f'async_{name}': value for name, value in self._async_stats.items()}
+        
+        pools = self._adapter.poolmanager.pools
+        sync_requests = sync_opened = 0
+        for pool_key in list(pools.keys()):
+            pool = pools.get(pool_key)
+            if pool is not None:
+                sync_requests += pool.num_requests
+                sync_opened += pool.num_connections
+        stats['sync_requests'] = sync_requests
+        stats['sync_connections_opened'] = sync_opened
+        stats['max_connections'] = self.max_connections
+        
+        requests_sent = sync_requests + stats['async_requests']
+        opened = sync_opened + stats['async_connections_opened']
+        stats['reuse_ratio'] = 1 - opened / requests_sent if requests_sent else 0.0
+        return stats
+    
+    def close(self):
+        """Close the shared requests session"""
+        self._session.close()
+    
+    async def aclose(self):
+        """Close the running loop's aiohttp session and forget the clients made for that loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._aiohttp_sessions.pop(loop, None)
+            for cache_key in [cache_key for cache_key in self._clients
+                              if cache_key[0] == 'async' and cache_key[1] is loop]:
+                del self._clients[cache_key]
+        if session is not None:
+            await session.close()
+    
+    def aiohttp_session(self) -> aiohttp.ClientSession:
+        """The running loop's aiohttp session, created there on first use"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._aiohttp_sessions.get(loop)
+            if session is None or session.closed:
+                trace = aiohttp.TraceConfig()
+                trace.on_request_start.append(self._count_async('requests'))
+                trace.on_connection_create_end.append(self._count_async('connections_opened'))
+                trace.on_connection_reuseconn.append(self._count_async('connections_reused'))
+                trace.on_connection_queued_start.append(self._count_async('queued'))
+                session = self._aiohttp_sessions[loop] = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(limit=self.max_connections,
+                                                   keepalive_timeout=self.keepalive_seconds),
+                    cookie_jar=aiohttp.DummyCookieJar(),
+                    auto_decompress=False,
+                    trust_env=True,
+                    trace_configs=[trace]
+                )
+            return session
+    
+    def _count_async(self, name: str):
+        """aiohttp trace hook that bumps one async counter"""
+        async def hook(session, context, params):
+            with self._lock:
+                self._async_stats[name] += 1
+        return hook
+    
+    @staticmethod
+    def _timeouts(timeout: Optional[float]) -> Dict[str, float]:
+        """Transport keyword arguments for a connect/read timeout"""
+        if not timeout:
+            return {}
+        return {'connection_timeout': timeout, 'read_timeout': timeout}
+
+
+class _SharedAioHttpTransport(AioHttpTransport):
+    """aiohttp transport that borrows the factory's session instead of owning one"""
+    
+    def __init__(self, factory: ClientFactory, **kwargs):
+        super().__init__(**kwargs)
+        self._factory = factory
+    
+    async def open(self):
+        """Pick up the running loop's session from the factory (again, if it was closed since)"""
+        if not self.session or self.session.closed:
+            self.session = self._factory.aiohttp_session()
+        await super().open()
+    
+    async def close(self):
+        """Leave the session open - the factory owns it and other clients still use it"""
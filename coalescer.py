@@ -0,0 +1,156 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+import logging
+from azure.core.exceptions import AzureError
+from azure_service import AzureTextAnalyzer
+from analysis_result import AnalysisResult
+from metrics import MetricsRegistry
+from result_cache import ResultCache
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+class _PendingAnalysis:
+    """One caller's request while its features are being fetched"""
+    
+    def __init__(self, text: str, features: List[str]):
+        self.text = text
+        self.features = features
+        self.future = Future()
+        self.results = {}
+        self._remaining = set(features)
+        self._lock = threading.Lock()
+    
+    def deliver(self, feature: str, value=None, error: Optional[str] = None):
+        """Record one feature; resolve the future once everything has arrived"""
+        with self._lock:
+            if self.future.done():
+                return
+            if error is not None:
+                self.future.set_exception(AzureError(f"Azure could not compute {feature}: {error}"))
+                return
+            self.results[feature] = value
+            self._remaining.discard(feature)
+            if not self._remaining:
+                self.future.set_result(AnalysisResult((f, self.results[f]) for f in self.features))
+    
+    def fail(self, error: Exception):
+        """Fail the whole request"""
+        with self._lock:
+            if not self.future.done():
+                self.future.set_exception(error)
+
+
+class RequestCoalescer:
+    """Process-wide micro-batcher: single-text analyses from every session are collected
+    for up to max_wait_ms or max_batch texts, then sent as one batched call per feature.
+    
+    Batches go through the analyzer's analyze_texts_batch, which doesn't use its
+    concurrent or actions mode, so wrap an analyzer built in sequential mode.
+    """
+    
+    def __init__(self, analyzer: AzureTextAnalyzer, max_wait_ms: float = 10, max_batch: int = 25,
+                 workers: int = 16):
+        self.analyzer = analyzer
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch = max_batch
+        self.logger = logger
+        
+        self.single_flight = SingleFlight()
+        
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="coalescer")
+        self._stats = {'requests': 0, 'batches': 0, 'batched_calls': 0}
+        self._stats_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._collect, name="coalescer", daemon=True)
+        self._thread.start()
+    
+    def analyze_text_comprehensive(self, text: str, features: Optional[Iterable[str]] = None) -> AnalysisResult:
+        """Same contract as AzureTextAnalyzer.analyze_text_comprehensive, served from a shared batch"""
+        if not text.strip():
+            raise ValueError("Text cannot be empty")
+        features = AzureTextAnalyzer.resolve_features(features)
+        # A batch only merges requests arriving together; this also catches ones still in flight
+        key = ResultCache.make_key(text, features)
+        with MetricsRegistry.default().timer('analyze_text'):
+            return self.single_flight.do(key, lambda: self._analyze(text, features, key))
+    
+    def _analyze(self, text: str, features: List[str], cache_key: str) -> AnalysisResult:
+        """Serve from the cache if possible, otherwise wait for a batch"""
+        cache = getattr(self.analyzer, 'cache', None)
+        if cache:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        # No point queueing for Azure while the breaker is short-circuiting calls
+        breaker = getattr(self.analyzer, 'circuit_breaker', None)
+        if breaker and breaker.is_open:
+            return self.analyzer.degraded_analysis(text, features)
+        
+        pending = _PendingAnalysis(text, features)
+        self._queue.put(pending)
+        try:
+            results = pending.future.result()
+        except AzureError:
+            if breaker and breaker.is_open:
+                return self.analyzer.degraded_analysis(text, features)
+            raise
+        if cache:
+            cache.set(cache_key, results)
+        return results
+    
+    def stats(self) -> Dict[str, int]:
+        """Requests seen, batches flushed and batched Azure calls made"""
+        with self._stats_lock:
+            return dict(self._stats)
+    
+    def _collect(self):
+        """Gather queued requests into batches until the time or size limit is hit"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._dispatch(batch)
+    
+    def _dispatch(self, batch: List[_PendingAnalysis]):
+        """Send one batched call per feature, each text only once"""
+        by_feature = {}
+        for pending in batch:
+            for feature in pending.features:
+                by_feature.setdefault(feature, {}).setdefault(pending.text, []).append(pending)
+        
+        with self._stats_lock:
+            self._stats['requests'] += len(batch)
+            self._stats['batches'] += 1
+            self._stats['batched_calls'] += len(by_feature)
+        
+        for feature, waiting in by_feature.items():
+            self._executor.submit(self._fetch, feature, waiting)
+        self.logger.debug(f"Coalesced {len(batch)} requests into {len(by_feature)} batched calls")
+    
+    def _fetch(self, feature: str, waiting: Dict[str, List[_PendingAnalysis]]):
+        """Run one feature for a set of texts and hand each caller its result"""
+        texts = list(waiting)
+        try:
+            results = self.analyzer.analyze_texts_batch(texts, features=[feature])
+        except Exception as e:
+            for pendings in waiting.values():
+                for pending in pendings:
+                    pending.fail(e)
+            return
+        
+        for text, result in zip(texts, results):
+            error = result.get('errors', {}).get(feature)
+            for pending in waiting[text]:
+                pending.deliver(feature, result[feature], error)
@@ -1,7 +1,8 @@
 import os
 from dotenv import load_dotenv
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,11 +12,18 @@ class AzureConfig:
     """Azure AI Language Service configuration"""
     endpoint: str
     key: str
+    tier: str = 'S'
+    requests_per_minute: Optional[float] = None
+    timeout: Optional[float] = None
+    # More (endpoint, key) pairs, e.g. resources in other regions, to spread requests over
+    extra_resources: List[Tuple[str, str]] = field(default_factory=list)
     
     def __post_init__(self):
         """Validate configuration after initialization"""
-        if not self.endpoint.startswith('https://'):
-            raise ValueError("Azure endpoint must be a valid HTTPS URL")
+        for endpoint, _ in self.resources:
+            # Plain http is only allowed for a local stand-in such as mock_language_server
+            if not endpoint.startswith('https://') and not self._is_local(endpoint):
+                raise ValueError("Azure endpoint must be a valid HTTPS URL")
         
         if len(self.key) < 30:
             logger.warning("Azure key seems short - double check if it's correct")
@@ -35,6 +43,13 @@ class AzureConfig:
                os.getenv("AZURE_KEY") or 
                os.getenv("LANGUAGE_KEY"))
         
+        # AZURE_LANGUAGE_ENDPOINTS/AZURE_LANGUAGE_KEYS list more resources, comma separated
+        resources = cls._parse_resources(os.getenv("AZURE_LANGUAGE_ENDPOINTS", ""),
+                                         os.getenv("AZURE_LANGUAGE_KEYS", ""))
+        if resources and not endpoint and not key:
+            endpoint, key = resources.pop(0)
+        extra_resources = [resource for resource in resources if resource[0] != endpoint]
+        
         # error messages for debugging
         if not endpoint:
             print("ERROR: Azure endpoint not found!")
@@ -52,20 +67,45 @@ class AzureConfig:
             print("  LANGUAGE_KEY=your_key_here")
             raise ValueError("Azure key not found in environment variables")
         
+        # Pricing tier drives the client-side rate limit; AZURE_LANGUAGE_RPM overrides it
+        tier = os.getenv("AZURE_LANGUAGE_TIER", "S")
+        rpm = os.getenv("AZURE_LANGUAGE_RPM")
+        
+        # Seconds to wait for a connection or a response before giving up
+        timeout = float(os.getenv("AZURE_LANGUAGE_TIMEOUT", "30"))
+        
         logger.info(f"Successfully loaded Azure config from {env_file}")
-        return cls(endpoint=endpoint, key=key)
+        return cls(endpoint=endpoint, key=key, tier=tier,
+                   requests_per_minute=float(rpm) if rpm else None, timeout=timeout,
+                   extra_resources=extra_resources)
+    
+    @property
+    def resources(self) -> List[Tuple[str, str]]:
+        """Every (endpoint, key) pair, the primary resource first"""
+        return [(self.endpoint, self.key)] + list(self.extra_resources)
+    
+    @staticmethod
+    def _is_local(endpoint: str) -> bool:
+        """Whether the endpoint is an http URL on this machine"""
+        parsed = urlparse(endpoint)
+        return parsed.scheme == 'http' and parsed.hostname in ('localhost', '127.0.0.1', '::1')
+    
+    @staticmethod
+    def _parse_resources(endpoints: str, keys: str) -> List[Tuple[str, str]]:
+        """Pair up comma-separated endpoint and key lists"""
+        endpoints = [endpoint.strip() for endpoint in endpoints.split(',') if endpoint.strip()]
+        keys = [key.strip() for key in keys.split(',') if key.strip()]
+        if len(endpoints) != len(keys):
+            raise ValueError(f"Got {len(endpoints)} Azure endpoints but {len(keys)} keys")
+        return list(zip(endpoints, keys))
     
     def test_connection(self) -> bool:
         """Test if the Azure credentials actually work"""
         try:
-            from azure.ai.textanalytics import TextAnalyticsClient
-            from azure.core.credentials import AzureKeyCredential
+            from client_factory import ClientFactory
             
-            # Create test client
-            client = TextAnalyticsClient(
-                endpoint=self.endpoint,
-                credential=AzureKeyCredential(self.key)
-            )
+            # Reuse the shared client (and its warm connections) rather than building a new one
+            client = ClientFactory.default().client(self.endpoint, self.key, timeout=self.timeout)
             
             # simple operation
             test_result = client.detect_language(documents=["test connection"])
@@ -82,6 +122,8 @@ class AzureConfig:
         print("=== Azure Configuration ===")
         print(f"Endpoint: {self.endpoint}")
         print(f"Key: {self.key[:8]}...{self.key[-4:]} (length: {len(self.key)})")
+        for endpoint, _ in self.extra_resources:
+            print(f"Extra endpoint: {endpoint}")
         print("=" * 30)
 
 def load_azure_config_simple():
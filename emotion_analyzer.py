@@ -1,4 +1,8 @@
-from typing import Dict, List, Optional
+import re
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from analysis_result import AnalysisResult
 
 class EmotionAnalyzer:
     """Handles emotion detection and mapping"""
@@ -14,60 +18,165 @@ class EmotionAnalyzer:
         'disgust': ['disgusted', 'sick', 'awful', 'terrible', 'hate', 'revolted', 'repulsed', 'nauseated']
     }
     
+    # Compiled by build_keyword_matcher() below - one regex for the whole lexicon
+    _KEYWORD_PATTERN = None
+    _KEYWORD_EMOTIONS = {}
+    _KEYWORD_INDEX = {}
+    _KEYWORD_MATRIX = None  # keywords x emotions, 1 where a keyword counts for an emotion
+    
+    @classmethod
+    def build_keyword_matcher(cls):
+        """Compile EMOTION_KEYWORDS into a single word-boundary regex (call again after editing the lexicon)"""
+        keyword_emotions = {}
+        for emotion, keywords in cls.EMOTION_KEYWORDS.items():
+            for keyword in keywords:
+                emotions = keyword_emotions.setdefault(keyword.lower(), [])
+                if emotion not in emotions:
+                    emotions.append(emotion)
+        
+        cls._KEYWORD_EMOTIONS = keyword_emotions
+        cls._KEYWORD_PATTERN = re.compile(r'\b' + _trie_regex(keyword_emotions) + r'\b')
+        
+        emotion_index = {emotion: i for i, emotion in enumerate(cls.EMOTION_KEYWORDS)}
+        cls._KEYWORD_INDEX = {keyword: i for i, keyword in enumerate(keyword_emotions)}
+        cls._KEYWORD_MATRIX = np.zeros((len(keyword_emotions), len(emotion_index)), dtype=np.int32)
+        for keyword, emotions in keyword_emotions.items():
+            for emotion in emotions:
+                cls._KEYWORD_MATRIX[cls._KEYWORD_INDEX[keyword], emotion_index[emotion]] = 1
+    
     @staticmethod
-    def determine_primary_emotion(analysis_results: Dict) -> str:
-        """Figure out the main emotion from Azure analysis results"""
+    def analyze_emotions(analysis_results: Mapping) -> Dict:
+        """Work out the primary emotion, its confidence and the keyword breakdown in one pass"""
         # Handles empty or invalid input
-        if not analysis_results or not isinstance(analysis_results, dict):
-            return 'neutral'
-        
-        # Extract data safely with fallbacks
-        sentiment_data = analysis_results.get('sentiment', {})
-        sentiment_scores = sentiment_data.get('scores', {}) if sentiment_data else {}
-        key_phrases = analysis_results.get('key_phrases', [])
-        entities = analysis_results.get('entities', [])
-        
-        # Combine text from key phrases and entities for keyword matching
-        text_to_analyze = []
+        if not analysis_results or not isinstance(analysis_results, Mapping):
+            return {'emotion': 'neutral', 'confidence': 0.0, 'breakdown': {}}
         
-        # Add key phrases
-        if key_phrases and isinstance(key_phrases, list):
-            text_to_analyze.extend(key_phrases)
+        breakdown = EmotionAnalyzer._count_keywords(EmotionAnalyzer._combined_text(analysis_results))
         
-        # Add entity text 
-        if entities and isinstance(entities, list):
-            for entity in entities:
-                if isinstance(entity, (list, tuple)) and len(entity) >= 1:
-                    text_to_analyze.append(str(entity[0]))
-        
-        # Convert to lowercase for matching
-        combined_text = ' '.join(text_to_analyze).lower()
-        
-        # Count emotion keywords
-        emotion_scores = {}
-        for emotion, keywords in EmotionAnalyzer.EMOTION_KEYWORDS.items():
-            # Count how many keywords appear in the text
-            keyword_count = sum(1 for keyword in keywords if keyword in combined_text)
-            emotion_scores[emotion] = keyword_count
-        
-        # Return emotion with most keyword matches if any found
-        max_score = max(emotion_scores.values()) if emotion_scores else 0
+        # Emotion with most keyword matches wins if any were found
+        max_score = max(breakdown.values()) if breakdown else 0
         if max_score > 0:
-            return max(emotion_scores, key=emotion_scores.get)
-        
-        # Fallback to sentiment analysis when no keywords found
-        positive_score = sentiment_scores.get('positive', 0)
-        negative_score = sentiment_scores.get('negative', 0)
-        
-        if positive_score > EmotionAnalyzer.POSITIVE_THRESHOLD:
-            return 'joy'
-        elif negative_score > EmotionAnalyzer.NEGATIVE_THRESHOLD:
-            return 'sadness'
+            emotion = max(breakdown, key=breakdown.get)
+        else:
+            # Fallback to sentiment analysis when no keywords found
+            sentiment_data = analysis_results.get('sentiment', {})
+            sentiment_scores = sentiment_data.get('scores', {}) if sentiment_data else {}
+            positive_score = sentiment_scores.get('positive', 0)
+            negative_score = sentiment_scores.get('negative', 0)
+            
+            if positive_score > EmotionAnalyzer.POSITIVE_THRESHOLD:
+                emotion = 'joy'
+            elif negative_score > EmotionAnalyzer.NEGATIVE_THRESHOLD:
+                emotion = 'sadness'
+            else:
+                emotion = 'neutral'
+        
+        return {
+            'emotion': emotion,
+            'confidence': EmotionAnalyzer.get_emotion_confidence(analysis_results, emotion),
+            'breakdown': breakdown
+        }
+    
+    @staticmethod
+    def analyze_emotions_batch(results_list: List[Mapping],
+                               positive_threshold: Optional[float] = None,
+                               negative_threshold: Optional[float] = None) -> Dict:
+        """Score many analysis results at once - same answers as analyze_emotions per result"""
+        breakdown, scores = EmotionAnalyzer.extract_emotion_features(results_list)
+        return EmotionAnalyzer.score_emotion_features(breakdown, scores, positive_threshold, negative_threshold)
+    
+    @staticmethod
+    def extract_emotion_features(results_list: List[Mapping]) -> Tuple[np.ndarray, np.ndarray]:
+        """Build the documents x emotions keyword count matrix and the documents x
+        (positive, neutral, negative) sentiment score array for a batch of results.
+        
+        This is the only per-document Python work; keep the arrays around to re-score
+        with different thresholds via score_emotion_features.
+        """
+        count = len(results_list)
+        pattern = EmotionAnalyzer._KEYWORD_PATTERN
+        keyword_index = EmotionAnalyzer._KEYWORD_INDEX
+        
+        # (document, keyword) pairs for every distinct hit
+        rows, cols = [], []
+        score_rows = []
+        for i, analysis_results in enumerate(results_list):
+            if not analysis_results or not isinstance(analysis_results, Mapping):
+                score_rows.append((0.0, 0.0, 0.0))
+                continue
+            for keyword in set(pattern.findall(EmotionAnalyzer._combined_text(analysis_results))):
+                rows.append(i)
+                cols.append(keyword_index[keyword])
+            if isinstance(analysis_results, AnalysisResult):
+                # Read the scores straight from the slot instead of building the sentiment dict
+                score_rows.append(analysis_results.sentiment_scores or (0.0, 0.0, 0.0))
+                continue
+            sentiment_data = analysis_results.get('sentiment', {})
+            sentiment_scores = sentiment_data.get('scores', {}) if sentiment_data else {}
+            score_rows.append((sentiment_scores.get('positive', 0.0),
+                               sentiment_scores.get('neutral', 0.0),
+                               sentiment_scores.get('negative', 0.0)))
+        scores = np.array(score_rows, dtype=np.float64).reshape(count, 3)
+        
+        # Sum each hit's keyword -> emotion row into its document's counts
+        rows = np.asarray(rows, dtype=np.intp)
+        emotion_hits = EmotionAnalyzer._KEYWORD_MATRIX[np.asarray(cols, dtype=np.intp)]
+        breakdown = np.zeros((count, len(EmotionAnalyzer.EMOTION_KEYWORDS)), dtype=np.int32)
+        for column in range(breakdown.shape[1]):
+            breakdown[:, column] = np.bincount(rows, weights=emotion_hits[:, column], minlength=count)
+        return breakdown, scores
+    
+    @staticmethod
+    def score_emotion_features(breakdown: np.ndarray, scores: np.ndarray,
+                               positive_threshold: Optional[float] = None,
+                               negative_threshold: Optional[float] = None) -> Dict:
+        """Apply the thresholds and argmax to extracted features in vectorized form.
+        
+        Returns 'emotions' (labels), 'confidence' (float array) and 'breakdown', whose
+        columns follow 'emotion_names'. Thresholds default to the class values.
+        """
+        if positive_threshold is None:
+            positive_threshold = EmotionAnalyzer.POSITIVE_THRESHOLD
+        if negative_threshold is None:
+            negative_threshold = EmotionAnalyzer.NEGATIVE_THRESHOLD
+        
+        emotion_names = list(EmotionAnalyzer.EMOTION_KEYWORDS)
+        count = len(scores)
+        positive, neutral, negative = scores[:, 0], scores[:, 1], scores[:, 2]
+        
+        # Labels are emotion_names plus 'neutral' at the end; argmax keeps the
+        # first emotion on ties, like max() over the breakdown dict does
+        labels = emotion_names + ['neutral']
+        neutral_index = len(emotion_names)
+        fallback = np.where(positive > positive_threshold, labels.index('joy'),
+                            np.where(negative > negative_threshold, labels.index('sadness'), neutral_index))
+        if emotion_names:
+            has_keywords = breakdown.max(axis=1, initial=0) > 0
+            label_index = np.where(has_keywords, breakdown.argmax(axis=1), fallback)
         else:
-            return 'neutral'
+            label_index = fallback
+        
+        # Same emotion -> sentiment score mapping as get_emotion_confidence
+        candidates = np.stack([positive, negative, np.maximum(positive, negative), neutral], axis=1)
+        negative_emotions = ('sadness', 'anger', 'fear', 'disgust')
+        source = np.array([0 if label == 'joy' else 1 if label in negative_emotions else 2 if label == 'surprise' else 3
+                           for label in labels])
+        confidence = candidates[np.arange(count), source[label_index]]
+        
+        return {
+            'emotions': np.array(labels, dtype=object)[label_index].tolist(),
+            'confidence': confidence,
+            'breakdown': breakdown,
+            'emotion_names': emotion_names
+        }
+    
+    @staticmethod
+    def determine_primary_emotion(analysis_results: Mapping) -> str:
+        """Figure out the main emotion from Azure analysis results"""
+        return EmotionAnalyzer.analyze_emotions(analysis_results)['emotion']
     
     @staticmethod
-    def get_emotion_confidence(analysis_results: Dict, detected_emotion: str) -> float:
+    def get_emotion_confidence(analysis_results: Mapping, detected_emotion: str) -> float:
         """Get confidence score for the detected emotion"""
         if not analysis_results or not detected_emotion:
             return 0.0
@@ -88,29 +197,59 @@ class EmotionAnalyzer:
             return sentiment_scores.get('neutral', 0.0)
     
     @staticmethod
-    def get_emotion_breakdown(analysis_results: Dict) -> Dict[str, int]:
+    def get_emotion_breakdown(analysis_results: Mapping) -> Dict[str, int]:
         """Get keyword count breakdown for all emotions"""
         if not analysis_results:
             return {}
-        
+        return EmotionAnalyzer._count_keywords(EmotionAnalyzer._combined_text(analysis_results))
+    
+    @staticmethod
+    def _combined_text(analysis_results: Mapping) -> str:
+        """Join key phrases and entity text into one lowercase string for keyword matching"""
         key_phrases = analysis_results.get('key_phrases', [])
         entities = analysis_results.get('entities', [])
         
-        # Combine text sources
         text_to_analyze = []
-        if key_phrases:
+        if key_phrases and isinstance(key_phrases, list):
             text_to_analyze.extend(key_phrases)
-        if entities:
+        if entities and isinstance(entities, list):
             for entity in entities:
                 if isinstance(entity, (list, tuple)) and len(entity) >= 1:
                     text_to_analyze.append(str(entity[0]))
         
-        combined_text = ' '.join(text_to_analyze).lower()
-        
-        # Count keywords for each emotion
-        breakdown = {}
-        for emotion, keywords in EmotionAnalyzer.EMOTION_KEYWORDS.items():
-            count = sum(1 for keyword in keywords if keyword in combined_text)
-            breakdown[emotion] = count
-        
-        return breakdown
\ No newline at end of file
+        return ' '.join(text_to_analyze).lower()
+    
+    @staticmethod
+    def _count_keywords(combined_text: str) -> Dict[str, int]:
+        """Count distinct whole-word keyword hits per emotion with a single regex scan"""
+        breakdown = dict.fromkeys(EmotionAnalyzer.EMOTION_KEYWORDS, 0)
+        for keyword in set(EmotionAnalyzer._KEYWORD_PATTERN.findall(combined_text)):
+            for emotion in EmotionAnalyzer._KEYWORD_EMOTIONS[keyword]:
+                breakdown[emotion] += 1
+        return breakdown
+
+
+def _trie_regex(words) -> str:
+    """Regex alternation for the words with shared prefixes factored out, so matching
+    cost stays flat as the lexicon grows"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    
+    def build(node) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # A word ends here too - the longer words are optional (greedy, so longest wins)
+            pattern = '(?:' + pattern + ')?'
+        return pattern
+    
+    return build(trie)
+
+
+EmotionAnalyzer.build_keyword_matcher()
\ No newline at end of file
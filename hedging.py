@@ -0,0 +1,144 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+import logging
+from metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+class RequestHedger:
+    """Sends a second copy of a slow request and takes whichever answer comes first.
+    
+    A call still running after its action's rolling p95 latency gets a duplicate
+    (the callers route it to another resource when there is one). Hedges are
+    capped at `budget` times the number of calls so a general slowdown can't
+    double the load on Azure, and each one must also be let through by the
+    caller's `admit` check, e.g. a free rate limit token.
+    """
+    
+    def __init__(self, budget: float = 0.1, window: int = 200, min_samples: int = 20,
+                 min_delay: float = 0.05, workers: int = 32):
+        self.budget = budget
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.window = window
+        self.logger = logger
+        
+        self._latencies = {}  # action -> deque of recent latencies
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'hedged': 0, 'hedge_wins': 0, 'over_budget': 0, 'not_admitted': 0}
+    
+    def call(self, action: str, attempt: Callable, admit: Optional[Callable[[], bool]] = None):
+        """Run a blocking attempt, hedging it if it's slow.
+        
+        A thread can't be interrupted, so a losing attempt is left to finish in the
+        background and its result is thrown away.
+        """
+        delay = self._hedge_delay(action)
+        started = time.monotonic()
+        if delay is None:
+            result = attempt()
+            self._record(action, time.monotonic() - started)
+            return result
+        
+        first = self._executor.submit(attempt)
+        done, _ = wait([first], timeout=delay)
+        if done or not self._take_budget(admit):
+            result = first.result()
+            self._record(action, time.monotonic() - started)
+            return result
+        
+        second = self._executor.submit(attempt)
+        pending = {first, second}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = self._winner(done, pending)
+            if winner is not None:
+                for loser in pending:
+                    loser.cancel()
+                return self._finish(action, started, winner is second, winner.result)
+    
+    async def acall(self, action: str, attempt: Callable, admit: Optional[Callable[[], bool]] = None):
+        """Async twin of call(); the losing attempt is cancelled"""
+        delay = self._hedge_delay(action)
+        started = time.monotonic()
+        if delay is None:
+            result = await attempt()
+            self._record(action, time.monotonic() - started)
+            return result
+        
+        first = asyncio.ensure_future(attempt())
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done or not self._take_budget(admit):
+            result = await first
+            self._record(action, time.monotonic() - started)
+            return result
+        
+        second = asyncio.ensure_future(attempt())
+        pending = {first, second}
+        try:
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = self._winner(done, pending)
+                if winner is not None:
+                    return self._finish(action, started, winner is second, winner.result)
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    def stats(self) -> Dict[str, int]:
+        """Calls seen, hedges sent, hedges that answered first and hedges skipped for budget or admission"""
+        with self._lock:
+            return dict(self._stats)
+    
+    @staticmethod
+    def _winner(done, pending):
+        """The first successful attempt; a failure only wins once nothing is left running"""
+        for attempt in done:
+            if attempt.exception() is None:
+                return attempt
+        if not pending:
+            return next(iter(done))
+        return None
+    
+    def _finish(self, action: str, started: float, hedge_won: bool, result: Callable):
+        """Count the outcome of a hedged call and return (or raise) the winner's result"""
+        if hedge_won:
+            with self._lock:
+                self._stats['hedge_wins'] += 1
+        self._record(action, time.monotonic() - started)
+        return result()
+    
+    def _hedge_delay(self, action: str) -> Optional[float]:
+        """The action's rolling p95 latency, or None while there's too little history"""
+        with self._lock:
+            self._stats['calls'] += 1
+            latencies = self._latencies.get(action)
+            if not latencies or len(latencies) < self.min_samples:
+                return None
+            ordered = sorted(latencies)
+        return max(self.min_delay, LatencyHistogram.percentile(ordered, 0.95))
+    
+    def _take_budget(self, admit: Optional[Callable[[], bool]] = None) -> bool:
+        """Spend one hedge if we are still under budget and the caller admits it"""
+        with self._lock:
+            if self._stats['hedged'] + 1 > self.budget * self._stats['calls']:
+                self._stats['over_budget'] += 1
+                return False
+        if admit is not None and not admit():
+            with self._lock:
+                self._stats['not_admitted'] += 1
+            return False
+        with self._lock:
+            self._stats['hedged'] += 1
+        self.logger.info("Hedging a slow Azure call")
+        return True
+    
+    def _record(self, action: str, latency: float):
+        """Add a finished call's latency to the action's window"""
+        with self._lock:
+            self._latencies.setdefault(action, deque(maxlen=self.window)).append(latency)
@@ -0,0 +1,124 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+import logging
+from azure_service import AzureTextAnalyzer
+from coalescer import RequestCoalescer
+from analysis_result import AnalysisResult
+from result_cache import ResultCache
+from text_chunker import TextChunker
+
+logger = logging.getLogger(__name__)
+
+class IncrementalAnalyzer:
+    """Analyzes text sentence by sentence, re-sending only sentences it hasn't seen.
+    
+    Per-sentence results are kept in `sentence_results` (e.g. a dict living in the
+    Streamlit session) keyed by a hash of the sentence and feature, so editing one
+    sentence and analyzing again costs one sentence's worth of Azure calls. The
+    sentence results are merged into the usual whole-text shape, so sentiment is
+    a length-weighted average of the sentences rather than a whole-text score.
+    
+    Behind a RequestCoalescer, new sentences are submitted all at once so it
+    folds them into one batched call per feature, with its cache and
+    single-flight. Any other analyzer gets one analyze_texts_batch call per
+    feature for the sentences its cache doesn't have. Whenever a sentence
+    fails, the whole text goes through the normal path instead.
+    """
+    
+    def __init__(self, analyzer, sentence_results: Optional[OrderedDict] = None, max_entries: int = 2000,
+                 max_workers: int = 8):
+        self.analyzer = analyzer
+        self.sentence_results = sentence_results if sentence_results is not None else OrderedDict()
+        self.max_entries = max_entries
+        self.max_workers = max_workers
+        self.logger = logger
+    
+    def analyze_text_comprehensive(self, text: str, features: Optional[Iterable[str]] = None) -> AnalysisResult:
+        """Same contract as AzureTextAnalyzer.analyze_text_comprehensive"""
+        if not text.strip():
+            raise ValueError("Text cannot be empty")
+        features = AzureTextAnalyzer.resolve_features(features)
+        sentences = [sentence for sentence in TextChunker.split_sentences(text) if sentence.strip()]
+        
+        missing = {}  # sentence -> features it has no stored result for
+        for sentence in sentences:
+            needed = [feature for feature in features if self._key(sentence, feature) not in self.sentence_results]
+            if needed:
+                missing[sentence] = needed
+        
+        if missing:
+            try:
+                if isinstance(self.analyzer, RequestCoalescer):
+                    results = self._fetch_coalesced(missing)
+                else:
+                    results = self._fetch_batched(missing, features)
+            except Exception as e:
+                self.logger.warning(f"Sentence analysis failed, analyzing the whole text: {e}")
+                results = None
+            if results is None:
+                # Let the whole-text path deal with it (error message, degraded mode...)
+                return self.analyzer.analyze_text_comprehensive(text, features=features)
+            for sentence, result in zip(missing, results):
+                for feature in missing[sentence]:
+                    self.sentence_results[self._key(sentence, feature)] = result[feature]
+        sent = sum(len(needed) for needed in missing.values())
+        
+        sentence_results = [
+            {feature: self._lookup(sentence, feature) for feature in features} for sentence in sentences
+        ]
+        self._prune()
+        self.logger.info(f"Requested {sent} sentence analyses, reused {len(sentences) * len(features) - sent}")
+        return AnalysisResult(TextChunker.merge(sentence_results, sentences, features))
+    
+    def _fetch_coalesced(self, missing: Dict[str, List[str]]) -> Optional[List[Dict]]:
+        """Submit every new sentence at once so the coalescer batches them; None if any failed"""
+        with ThreadPoolExecutor(max_workers=min(len(missing), self.max_workers),
+                                thread_name_prefix="sentence") as executor:
+            results = list(executor.map(
+                lambda sentence: self.analyzer.analyze_text_comprehensive(sentence, features=missing[sentence]),
+                missing
+            ))
+        if any('errors' in result or result.get('degraded') for result in results):
+            return None
+        return results
+    
+    def _fetch_batched(self, missing: Dict[str, List[str]], features: List[str]) -> Optional[List[Dict]]:
+        """One batched call per feature for the sentences not in the analyzer's cache; None if any failed"""
+        cache = getattr(self.analyzer, 'cache', None)
+        results = {sentence: {} for sentence in missing}
+        for feature in features:
+            wanted = [sentence for sentence, needed in missing.items() if feature in needed]
+            uncached = []
+            for sentence in wanted:
+                cached = cache.get(self._key(sentence, feature)) if cache else None
+                if cached is not None:
+                    results[sentence][feature] = cached[feature]
+                else:
+                    uncached.append(sentence)
+            if not uncached:
+                continue
+            for sentence, result in zip(uncached, self.analyzer.analyze_texts_batch(uncached, features=[feature])):
+                if 'errors' in result:
+                    return None
+                results[sentence][feature] = result[feature]
+                if cache:
+                    # Same key the analyzer would use for this sentence and feature on its own
+                    cache.set(self._key(sentence, feature), {feature: result[feature]})
+        return [results[sentence] for sentence in missing]
+    
+    def _lookup(self, sentence: str, feature: str):
+        """A stored sentence result, marked as recently used"""
+        key = self._key(sentence, feature)
+        self.sentence_results.move_to_end(key)
+        return self.sentence_results[key]
+    
+    def _prune(self):
+        """Forget the least recently used sentences once over max_entries"""
+        while len(self.sentence_results) > self.max_entries:
+            self.sentence_results.popitem(last=False)
+    
+    @staticmethod
+    def _key(sentence: str, feature: str) -> str:
+        """Whitespace-insensitive hash of one sentence and feature"""
+        return ResultCache.make_key(sentence, [feature])
@@ -0,0 +1,190 @@
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import logging
+from streamlit.testing.v1 import AppTest
+from benchmark import BenchmarkSuite
+from metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+class LoadTest:
+    """Drives many simulated users through the Streamlit app in one process.
+    
+    Every session is a headless AppTest of main.py that repeatedly types a
+    text, clicks Analyze and flips one of the sidebar feature checkboxes, so
+    the shared analyzer (cache_resource) sees the same mix of traffic a real
+    deployment would. Reports reruns per second, rerun latency percentiles
+    per action and how much each session's state grew.
+    
+    AppTest swaps process-wide Streamlit state on every run, so reruns take
+    turns here where a real server would overlap their Azure waits. Latencies
+    include that queueing, which makes the numbers a pessimistic bound.
+    """
+    
+    ACTIONS = ('type', 'analyze', 'toggle')
+    
+    FEATURE_CHECKBOXES = ("Sentiment Analysis", "Key Phrases", "Named Entities",
+                          "Language Detection", "PII Detection")
+    
+    # AppTest.run isn't safe to call from two threads at once
+    _run_lock = threading.Lock()
+    
+    def __init__(self, app_path: str = 'main.py', sessions: int = 10, rounds: int = 5,
+                 think_time: float = 0.0, timeout: float = 60.0, texts: Optional[List[str]] = None,
+                 seed: Optional[int] = None):
+        self.app_path = app_path
+        self.sessions = sessions
+        self.rounds = rounds
+        self.think_time = think_time
+        self.timeout = timeout
+        self.texts = texts or BenchmarkSuite.SAMPLE_TEXTS
+        self.seed = seed
+        self.logger = logger
+        
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._service = None
+        self._memory = []
+    
+    def run(self) -> Dict:
+        """Run every session to completion and summarize what happened"""
+        self._service = LatencyHistogram(window=self.sessions * (len(self.ACTIONS) * self.rounds + 1))
+        rss_before = self._peak_rss()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.sessions, thread_name_prefix="session") as executor:
+            list(executor.map(self._session, range(self.sessions)))
+        elapsed = time.perf_counter() - started
+        rss_after = self._peak_rss()
+        
+        actions = {}
+        for action, histogram in sorted(self._histograms.items()):
+            quantiles = histogram.quantiles()
+            actions[action] = {
+                'reruns': histogram.count,
+                'errors': histogram.errors,
+                'p50_ms': quantiles[0.5] * 1000,
+                'p95_ms': quantiles[0.95] * 1000,
+                'p99_ms': quantiles[0.99] * 1000
+            }
+        reruns = sum(histogram.count for histogram in self._histograms.values())
+        overall = LatencyHistogram(window=max(reruns, 1))
+        for histogram in self._histograms.values():
+            for sample in histogram._samples:
+                overall.observe(sample)
+        quantiles = overall.quantiles()
+        service = self._service.quantiles()
+        
+        growth = [end - start for start, end in self._memory]
+        return {
+            'sessions': self.sessions,
+            'rounds': self.rounds,
+            'seconds': elapsed,
+            'reruns': reruns,
+            'errors': sum(histogram.errors for histogram in self._histograms.values()),
+            'reruns_per_second': reruns / elapsed if elapsed > 0 else 0.0,
+            'analyses_per_second': actions.get('analyze', {}).get('reruns', 0) / elapsed if elapsed > 0 else 0.0,
+            'rerun_p50_ms': quantiles[0.5] * 1000,
+            'rerun_p95_ms': quantiles[0.95] * 1000,
+            'rerun_p99_ms': quantiles[0.99] * 1000,
+            # Time spent running the script itself, without waiting for other sessions
+            'service_p50_ms': service[0.5] * 1000,
+            'service_p99_ms': service[0.99] * 1000,
+            'actions': actions,
+            'session_state_bytes': {
+                'mean_start': sum(start for start, _ in self._memory) / len(self._memory) if self._memory else 0,
+                'mean_growth': sum(growth) / len(growth) if growth else 0,
+                'max_growth': max(growth, default=0)
+            },
+            'process_peak_rss_growth_bytes': (rss_after - rss_before) if rss_before is not None else None
+        }
+    
+    def _session(self, number: int):
+        """One simulated user: load the page, then type/analyze/toggle for every round"""
+        rng = random.Random(None if self.seed is None else self.seed + number)
+        app = AppTest.from_file(self.app_path, default_timeout=self.timeout)
+        self._rerun('load', app.run)
+        start_size = self._state_size(app)
+        
+        for round_number in range(self.rounds):
+            for action in self.ACTIONS:
+                if self.think_time:
+                    time.sleep(rng.uniform(0, 2 * self.think_time))
+                if action == 'type':
+                    text = f"{rng.choice(self.texts)} (session {number}, round {round_number})"
+                    self._rerun(action, app.text_area(key="text_input").input(text).run)
+                elif action == 'analyze':
+                    button = next(button for button in app.button if "Analyze" in button.label)
+                    self._rerun(action, button.click().run)
+                else:
+                    label = rng.choice(self.FEATURE_CHECKBOXES)
+                    checkbox = next(checkbox for checkbox in app.checkbox if checkbox.label == label)
+                    self._rerun(action, checkbox.set_value(not checkbox.value).run)
+        
+        self._memory_sample(start_size, self._state_size(app))
+    
+    def _rerun(self, action: str, run):
+        """Time one rerun, waiting included; a script exception or timeout counts as an error"""
+        started = time.perf_counter()
+        error = False
+        try:
+            with self._run_lock:
+                service_started = time.perf_counter()
+                try:
+                    app = run()
+                finally:
+                    service = time.perf_counter() - service_started
+            error = bool(app.exception)
+            if error:
+                self.logger.warning(f"Rerun after '{action}' raised: {app.exception[0].message}")
+        except Exception as e:
+            error = True
+            self.logger.warning(f"Rerun after '{action}' failed: {e}")
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._service.observe(service)
+            histogram = self._histograms.get(action)
+            if histogram is None:
+                histogram = self._histograms[action] = LatencyHistogram(window=self.sessions * (self.rounds + 1))
+            histogram.observe(elapsed, error)
+    
+    def _memory_sample(self, start: int, end: int):
+        """Remember one session's state size before and after its rounds"""
+        with self._lock:
+            self._memory.append((start, end))
+    
+    @classmethod
+    def _state_size(cls, app: AppTest) -> int:
+        """Approximate bytes held by a session's state (keyed values, not widget internals)"""
+        return sum(cls._deep_size(value) for value in app.session_state.to_dict().values())
+    
+    @classmethod
+    def _deep_size(cls, value, seen: Optional[set] = None) -> int:
+        """sys.getsizeof of a value and everything reachable through containers"""
+        seen = set() if seen is None else seen
+        if id(value) in seen:
+            return 0
+        seen.add(id(value))
+        size = sys.getsizeof(value)
+        if isinstance(value, dict):
+            size += sum(cls._deep_size(k, seen) + cls._deep_size(v, seen) for k, v in value.items())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            size += sum(cls._deep_size(item, seen) for item in value)
+        elif hasattr(type(value), '__slots__'):
+            size += sum(cls._deep_size(getattr(value, slot), seen) for slot in type(value).__slots__
+                        if hasattr(value, slot))
+        return size
+    
+    @staticmethod
+    def _peak_rss() -> Optional[int]:
+        """Peak resident memory of this process in bytes, where the platform reports it"""
+        try:
+            import resource
+        except ImportError:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak if sys.platform == 'darwin' else peak * 1024
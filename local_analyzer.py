@@ -0,0 +1,181 @@
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+from azure.core.exceptions import AzureError
+from emotion_analyzer import EmotionAnalyzer
+from analysis_result import AnalysisResult
+
+logger = logging.getLogger(__name__)
+
+class LocalTextAnalyzer:
+    """Offline lexicon-based analysis with the same result shape as AzureTextAnalyzer"""
+    
+    # Features the lexicons can answer - everything else needs Azure
+    FEATURES = ('sentiment', 'key_phrases')
+    
+    POSITIVE_WORDS = {
+        'good', 'great', 'happy', 'love', 'loved', 'lovely', 'wonderful', 'excellent', 'amazing',
+        'awesome', 'fantastic', 'glad', 'grateful', 'thankful', 'excited', 'exciting', 'joy',
+        'pleased', 'proud', 'calm', 'relaxed', 'hopeful', 'fun', 'enjoy', 'enjoyed', 'best',
+        'better', 'nice', 'beautiful', 'perfect', 'delighted', 'thrilled', 'ecstatic', 'cheerful',
+        'content', 'peaceful', 'blessed', 'optimistic', 'confident', 'motivated', 'inspired',
+        'rewarding', 'promoted', 'success', 'successful', 'win', 'won', 'relieved', 'fine'
+    }
+    NEGATIVE_WORDS = {
+        'bad', 'upset', 'stressed', 'stress', 'stressful', 'tired', 'exhausted', 'overwhelmed',
+        'horrible', 'worst', 'worse', 'struggling', 'struggle', 'pain', 'painful', 'cry', 'crying',
+        'fail', 'failed', 'failure', 'lost', 'hopeless', 'broken', 'alone', 'unhappy', 'bored',
+        'boring', 'sorry', 'regret', 'guilty', 'ashamed', 'jealous', 'insecure', 'empty', 'numb'
+    }
+    NEGATIONS = {'not', 'no', 'never', 'nothing', 'hardly', 'barely', 'cannot', 'without'}
+    
+    # Keyword hits act as evidence against this much "nothing to go on" neutral mass
+    SMOOTHING = 0.3
+    
+    # Words that make the next few tokens flip polarity ("not happy")
+    NEGATION_WINDOW = 3
+    
+    _TOKEN_PATTERN = re.compile(r"[a-z']+")
+    
+    def __init__(self):
+        # Emotion keywords count towards sentiment too, surprise being neither
+        self.positive_words = set(self.POSITIVE_WORDS) | set(EmotionAnalyzer.EMOTION_KEYWORDS.get('joy', []))
+        self.negative_words = set(self.NEGATIVE_WORDS)
+        for emotion in ('sadness', 'anger', 'fear', 'disgust'):
+            self.negative_words |= set(EmotionAnalyzer.EMOTION_KEYWORDS.get(emotion, []))
+    
+    def analyze_text_comprehensive(self, text: str, features: Optional[Iterable[str]] = None) -> AnalysisResult:
+        """Run the local analysis on the text - features it can't compute are left out"""
+        return self.analyze_with_confidence(text, features)[0]
+    
+    def analyze_with_confidence(self, text: str, features: Optional[Iterable[str]] = None) -> Tuple[AnalysisResult, float]:
+        """Local results plus how sure the lexicon is about them (0 to 1)"""
+        if not text.strip():
+            raise ValueError("Text cannot be empty")
+        features = self.FEATURES if features is None else features
+        
+        lowered = text.lower()
+        positive_hits, negative_hits, sentiment_words = self._count_sentiment(lowered)
+        total = positive_hits + negative_hits
+        
+        results = AnalysisResult()
+        if 'sentiment' in features:
+            results['sentiment'] = self._sentiment(positive_hits, negative_hits)
+        if 'key_phrases' in features:
+            results['key_phrases'] = list(dict.fromkeys(sentiment_words))
+        
+        # Only one-sided evidence counts; no hits or an even split means "ask Azure"
+        confidence = abs(positive_hits - negative_hits) / (total + self.SMOOTHING)
+        return results, confidence
+    
+    def _count_sentiment(self, lowered: str) -> Tuple[int, int, List[str]]:
+        """Count positive and negative lexicon hits, flipping negated ones.
+        
+        Also returns the lexicon words that weren't negated, used as key phrases so
+        "not happy" doesn't read as joy.
+        """
+        positive_hits = negative_hits = 0
+        matched = []
+        negated_until = -1
+        for i, token in enumerate(self._TOKEN_PATTERN.findall(lowered)):
+            if token in self.NEGATIONS or token.endswith("n't"):
+                negated_until = i + self.NEGATION_WINDOW
+                continue
+            negated = i <= negated_until
+            if not negated and (token in EmotionAnalyzer._KEYWORD_EMOTIONS or
+                                token in self.positive_words or token in self.negative_words):
+                matched.append(token)
+            
+            if token in self.positive_words:
+                is_positive = True
+            elif token in self.negative_words:
+                is_positive = False
+            else:
+                continue
+            
+            if negated:
+                is_positive = not is_positive
+            if is_positive:
+                positive_hits += 1
+            else:
+                negative_hits += 1
+        return positive_hits, negative_hits, matched
+    
+    def _sentiment(self, positive_hits: int, negative_hits: int) -> Dict:
+        """Turn lexicon hit counts into Azure-style sentiment scores"""
+        denominator = positive_hits + negative_hits + self.SMOOTHING
+        scores = {
+            'positive': positive_hits / denominator,
+            'neutral': self.SMOOTHING / denominator,
+            'negative': negative_hits / denominator
+        }
+        if positive_hits and negative_hits:
+            label = 'mixed'
+        else:
+            label = max(scores, key=scores.get)
+        return {'label': label, 'scores': scores}
+
+
+class HybridTextAnalyzer:
+    """Answers from the local lexicon when it is confident and calls Azure otherwise"""
+    
+    def __init__(self, azure_analyzer=None, local_analyzer: Optional[LocalTextAnalyzer] = None,
+                 threshold: float = 0.75):
+        self.azure = azure_analyzer
+        self.local = local_analyzer or LocalTextAnalyzer()
+        self.threshold = threshold
+        self.logger = logger
+        
+        self._lock = threading.Lock()
+        self._stats = {'local': 0, 'azure': 0, 'fallbacks': 0}
+    
+    def analyze_text_comprehensive(self, text: str, features: Optional[Iterable[str]] = None) -> AnalysisResult:
+        """Run the analysis locally first, sending Azure only what the lexicon can't answer"""
+        from azure_service import AzureTextAnalyzer
+        features = AzureTextAnalyzer.resolve_features(features)
+        
+        local_features = [feature for feature in features if feature in self.local.FEATURES]
+        local_results, confidence = self.local.analyze_with_confidence(text, local_features)
+        
+        if confidence >= self.threshold:
+            remote_features = [feature for feature in features if feature not in local_results]
+        else:
+            remote_features = features
+        
+        if not remote_features:
+            self._count('local')
+            self.logger.info(f"Answered locally with confidence {confidence:.2f}")
+            return local_results
+        
+        if self.azure is None:
+            self._count('fallbacks')
+            return local_results
+        
+        try:
+            remote_results = self.azure.analyze_text_comprehensive(text, features=remote_features)
+        except AzureError as e:
+            # Network or service trouble - keep the app working on the local answer
+            self._count('fallbacks')
+            self.logger.warning(f"Azure unavailable, using local analysis: {e}")
+            return local_results
+        
+        self._count('azure')
+        merged = local_results.copy()
+        merged.update(remote_results)
+        result = AnalysisResult((feature, merged[feature]) for feature in features if feature in merged)
+        # Keep Azure's failure markers so the app can still say it's running degraded
+        for key in ('errors', 'degraded'):
+            if key in remote_results:
+                result[key] = remote_results[key]
+        return result
+    
+    def stats(self) -> Dict[str, int]:
+        """How many analyses were served locally, by Azure, or fell back to local"""
+        with self._lock:
+            return dict(self._stats)
+    
+    def _count(self, outcome: str):
+        """Bump one of the routing counters"""
+        with self._lock:
+            self._stats[outcome] += 1
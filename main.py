@@ -1,25 +1,118 @@
 import streamlit as st
 from config import AzureConfig
 from azure_service import AzureTextAnalyzer
+from result_cache import ResultCache
+from rate_limit import RateLimiter
+from circuit_breaker import CircuitBreaker
+from hedging import RequestHedger
+from metrics import MetricsRegistry
+from profiling import RerunProfiler
+from local_analyzer import HybridTextAnalyzer
+from coalescer import RequestCoalescer
+from incremental_analyzer import IncrementalAnalyzer
+from mood_history import MoodHistory
 from emotion_analyzer import EmotionAnalyzer
 from recommend import RecommendationEngine
 import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+import pandas as pd
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+metrics = MetricsRegistry.default()
+profiler = RerunProfiler.from_env()
+
+def env_flag(name, default=""):
+    """True when an environment variable is set to 1/true/yes"""
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
 
 @st.cache_resource
 def initialize_azure_client():
     """Initialize Azure client with caching for performance"""
+    local_first = env_flag("MOODIFY_LOCAL_FIRST")
+    threshold = float(os.getenv("MOODIFY_LOCAL_THRESHOLD", "0.75"))
+    coalesce_ms = float(os.getenv("MOODIFY_COALESCE_MS", "10"))
+    # The coalescer sends its own batched calls, so the analyzer's mode only matters without it
+    mode = os.getenv("MOODIFY_ANALYSIS_MODE", "concurrent")
+    if coalesce_ms > 0:
+        if os.getenv("MOODIFY_ANALYSIS_MODE"):
+            logger.warning(f"MOODIFY_ANALYSIS_MODE={mode} is ignored while MOODIFY_COALESCE_MS > 0")
+        mode = 'sequential'
     try:
         config = AzureConfig.from_env()
-        return AzureTextAnalyzer(config)
+        analyzer = AzureTextAnalyzer(
+            config,
+            mode=mode,
+            cache=ResultCache.from_env(),
+            rate_limiter=RateLimiter.for_tier(config.tier, config.requests_per_minute, len(config.resources)),
+            circuit_breaker=CircuitBreaker.from_env(),
+            hedger=RequestHedger(budget=float(os.getenv("MOODIFY_HEDGE_BUDGET", "0.1"))) if env_flag("MOODIFY_HEDGE") else None
+        )
+        
+        # Batch concurrent clicks from every session into shared Azure calls
+        if coalesce_ms > 0:
+            analyzer = RequestCoalescer(
+                analyzer,
+                max_wait_ms=coalesce_ms,
+                max_batch=int(os.getenv("MOODIFY_COALESCE_MAX", "25"))
+            )
+        
+        if local_first:
+            return HybridTextAnalyzer(analyzer, threshold=threshold)
+        return analyzer
     except Exception as e:
+        if local_first:
+            # No Azure at all - the local lexicon still gives a result
+            logger.warning(f"Azure client unavailable, running offline: {e}")
+            return HybridTextAnalyzer(None, threshold=threshold)
         st.error(f"Failed to initialize Azure client: {e}")
         logger.error(f"Azure client initialization failed: {e}")
         return None
 
+@st.cache_resource
+def initialize_mood_history():
+    """Shared mood history store, or None unless MOODIFY_HISTORY_DB is set"""
+    try:
+        return MoodHistory.from_env()
+    except Exception as e:
+        logger.error(f"Mood history unavailable: {e}")
+        return None
+
+def current_user_id():
+    """Anonymous id kept in the ?user= link, so bookmarking the page keeps the history"""
+    if 'user_id' not in st.session_state:
+        st.session_state.user_id = st.query_params.get('user') or uuid.uuid4().hex
+    if st.query_params.get('user') != st.session_state.user_id:
+        st.query_params['user'] = st.session_state.user_id
+    return st.session_state.user_id
+
+def session_analyzer(azure_client):
+    """Analyzer that only sends Azure the sentences changed since this session's last analysis.
+    
+    Opt-in: a first analysis costs more requests and text records sentence by
+    sentence, and sentiment becomes an average over sentences.
+    """
+    # Local-first analysis is free already, and needs no sentence bookkeeping
+    if not env_flag("MOODIFY_INCREMENTAL") or azure_client is None or isinstance(azure_client, HybridTextAnalyzer):
+        return azure_client
+    return IncrementalAnalyzer(azure_client, st.session_state.sentence_results)
+
+def selected_features(show_entities, show_language, show_pii):
+    """Azure features needed for the current sidebar toggles"""
+    # Sentiment and key phrases always drive emotion detection
+    features = ['sentiment', 'key_phrases']
+    if show_entities:
+        features.append('entities')
+    if show_language:
+        features.append('language')
+    if show_pii:
+        features.append('pii_entities')
+    return features
+
 def main():
     """Main Streamlit application"""
     st.set_page_config(
@@ -39,6 +132,10 @@ def main():
         st.session_state.last_recommendation = ""
     if 'analysis_results' not in st.session_state:
         st.session_state.analysis_results = None
+    if 'analyzed_text' not in st.session_state:
+        st.session_state.analyzed_text = ""
+    if 'sentence_results' not in st.session_state:
+        st.session_state.sentence_results = OrderedDict()
     
     # Initialize Azure client
     azure_client = initialize_azure_client()
@@ -109,6 +206,9 @@ def main():
         show_language = st.checkbox("Language Detection", value=False)
         show_pii = st.checkbox("PII Detection", value=False)
     
+    if env_flag("MOODIFY_DIAGNOSTICS"):
+        display_diagnostics()
+    
     # Main input area
     st.subheader("💭 How are you feeling?")
     user_text = st.text_area(
@@ -141,10 +241,12 @@ def main():
             st.session_state.last_emotion = ""
             st.session_state.last_recommendation = ""
             st.session_state.analysis_results = None
+            st.session_state.analyzed_text = ""
             st.rerun()
     
     # Update session state with current text
     st.session_state.user_text = user_text
+    features = selected_features(show_entities, show_language, show_pii)
     
     # Main analysis logic
     if analyze_button:
@@ -155,19 +257,29 @@ def main():
         with st.spinner("Analyzing with Azure AI..."):
             try:
                 # Get Azure analysis
-                analysis_results = azure_client.analyze_text_comprehensive(user_text)
+                analysis_results = session_analyzer(azure_client).analyze_text_comprehensive(user_text, features=features)
                 
                 if not analysis_results:
                     st.error("❌ Analysis failed. Check your Azure connection.")
                     return
                 
+                if analysis_results.get('degraded'):
+                    st.info("ℹ️ Azure is slow or unavailable right now, showing a quick offline analysis.")
+                
                 # Get emotion
-                primary_emotion = EmotionAnalyzer.determine_primary_emotion(analysis_results)
+                with metrics.timer('emotion'):
+                    emotion = EmotionAnalyzer.analyze_emotions(analysis_results)
+                primary_emotion = emotion['emotion']
+                
+                mood_history = initialize_mood_history()
+                if mood_history:
+                    mood_history.record(current_user_id(), primary_emotion, analysis_results, emotion['breakdown'])
                 
                 # Store results in session state
                 st.session_state.last_emotion = primary_emotion
                 st.session_state.show_results = True
                 st.session_state.analysis_results = analysis_results
+                st.session_state.analyzed_text = user_text
                 
                 # Display main result
                 display_main_result(primary_emotion, recommendation_type)
@@ -185,12 +297,32 @@ def main():
     elif st.session_state.show_results and st.session_state.last_emotion:
         display_main_result(st.session_state.last_emotion, recommendation_type)
         
+        # Fetch only the features switched on since the last analysis
+        if st.session_state.analysis_results and st.session_state.analyzed_text:
+            missing = [f for f in features if f not in st.session_state.analysis_results]
+            if missing:
+                try:
+                    with st.spinner("Fetching extra analysis..."):
+                        extra = session_analyzer(azure_client).analyze_text_comprehensive(
+                            st.session_state.analyzed_text, features=missing)
+                        # Keep the flag describing the original analysis
+                        extra.pop('degraded', None)
+                        st.session_state.analysis_results.update(extra)
+                except Exception as e:
+                    logger.error(f"Extra analysis error: {e}")
+                    st.error(f"❌ Something went wrong: {str(e)}")
+        
         # Show detailed analysis if requested and data exists
         if (st.session_state.analysis_results and 
             any([show_sentiment, show_keyphrases, show_entities, show_language, show_pii])):
             display_detailed_analysis(st.session_state.analysis_results, show_sentiment, show_keyphrases, 
                                     show_entities, show_language, show_pii)
+    
+    mood_history = initialize_mood_history()
+    if mood_history:
+        display_mood_history(mood_history, current_user_id())
 
+@metrics.timed('render.main_result')
 def display_main_result(emotion, rec_type):
     """Show the main emotion and recommendation"""
     
@@ -203,7 +335,8 @@ def display_main_result(emotion, rec_type):
     """, unsafe_allow_html=True)
     
     # Get recommendation
-    recommendation = RecommendationEngine.get_recommendation(emotion, rec_type)
+    with metrics.timer('recommendation'):
+        recommendation = RecommendationEngine.get_recommendation(emotion, rec_type)
     st.session_state.last_recommendation = recommendation
     
     st.markdown(f"""
@@ -213,6 +346,7 @@ def display_main_result(emotion, rec_type):
     </div>
     """, unsafe_allow_html=True)
 
+@metrics.timed('render.detailed_analysis')
 def display_detailed_analysis(analysis_results, show_sentiment, show_keyphrases, 
                             show_entities, show_language, show_pii):
     """Display detailed Azure AI analysis results"""
@@ -280,5 +414,67 @@ def display_detailed_analysis(analysis_results, show_sentiment, show_keyphrases,
             else:
                 st.success("✅ No personal information found")
 
+@metrics.timed('render.mood_history')
+def display_mood_history(mood_history, user_id):
+    """Rolling sentiment, its trend and daily emotion counts over the last 90 days"""
+    since = time.time() - 90 * MoodHistory.DAY
+    rolling = mood_history.rolling_average(user_id, since=since)
+    if not len(rolling['ts']):
+        return
+    
+    with st.expander("📈 Your Mood History", expanded=False):
+        trend = mood_history.trend(user_id, since=since)
+        times = pd.to_datetime(rolling['ts'], unit='s')
+        st.line_chart(pd.DataFrame({
+            '7-day positive': rolling['positive'],
+            '7-day negative': rolling['negative'],
+            'trend (positive - negative)': trend['fitted']
+        }, index=times))
+        # A slope from entries minutes apart says nothing about how the weeks are going
+        if rolling['ts'][-1] - rolling['ts'][0] >= 2 * MoodHistory.DAY:
+            slope = trend['slope_per_day']
+            direction = "improving" if slope > 0.001 else "declining" if slope < -0.001 else "steady"
+            st.caption(f"Your mood has been {direction} over the last 90 days "
+                       f"({slope * 7:+.2f} net sentiment per week)")
+        
+        frequency = mood_history.emotion_frequency(user_id, since=since)
+        counts = pd.DataFrame(frequency['counts'], columns=frequency['emotions'],
+                              index=pd.to_datetime(frequency['bucket_start'], unit='s'))
+        st.bar_chart(counts.loc[:, counts.sum() > 0])
+
+def display_diagnostics():
+    """Sidebar panel with per-stage latencies and the Prometheus export"""
+    with st.sidebar.expander("📊 Diagnostics"):
+        snapshot = metrics.snapshot()
+        if not snapshot:
+            st.write("No timings recorded yet")
+            return
+        st.dataframe([
+            {
+                'stage': stage,
+                'count': values['count'],
+                'errors': values['errors'],
+                'p50 ms': round(values['p50'] * 1000, 1),
+                'p95 ms': round(values['p95'] * 1000, 1),
+                'p99 ms': round(values['p99'] * 1000, 1)
+            }
+            for stage, values in snapshot.items()
+        ], hide_index=True)
+        st.download_button("Download Prometheus metrics", metrics.prometheus_text(),
+                           file_name="moodify_metrics.prom", mime="text/plain")
+
+def run_app():
+    """Run one rerun of the app, under the profiler if an admin asked for it"""
+    if not profiler.enabled or not profiler.requested(st.query_params):
+        main()
+        return
+    
+    path = profiler.run(main)
+    logger.info(f"Profiled this rerun: {path}")
+    # A ?profile=... link profiles one rerun, not every widget change after it
+    if 'profile' in st.query_params:
+        del st.query_params['profile']
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with metrics.timer('rerun'):
+        run_app()
\ No newline at end of file
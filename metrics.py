@@ -0,0 +1,138 @@
+import functools
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Sequence
+
+class LatencyHistogram:
+    """Count, error count, total time and recent samples for one stage"""
+    
+    QUANTILES = (0.5, 0.95, 0.99)
+    
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self._samples = deque(maxlen=window)
+    
+    def observe(self, seconds: float, error: bool = False):
+        """Record one timing"""
+        self.count += 1
+        self.total += seconds
+        if error:
+            self.errors += 1
+        self._samples.append(seconds)
+    
+    def quantiles(self) -> Dict[float, float]:
+        """p50/p95/p99 over the most recent samples"""
+        if not self._samples:
+            return {q: 0.0 for q in self.QUANTILES}
+        ordered = sorted(self._samples)
+        return {q: self.percentile(ordered, q) for q in self.QUANTILES}
+    
+    @staticmethod
+    def percentile(ordered: Sequence[float], q: float) -> float:
+        """Nearest-rank quantile q (0-1] of already sorted, non-empty values"""
+        # The tolerance stops float rounding just above a whole q * n from skipping a rank
+        rank = math.ceil(q * len(ordered) - 1e-9)
+        return ordered[min(len(ordered), max(rank, 1)) - 1]
+
+
+class MetricsRegistry:
+    """In-process latency histograms per stage, exportable in Prometheus text format"""
+    
+    _default = None
+    _default_lock = threading.Lock()
+    
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self._histograms = {}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def default(cls) -> 'MetricsRegistry':
+        """Process-wide registry every module records into"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+    
+    @contextmanager
+    def timer(self, stage: str):
+        """Time the enclosed block; an exception counts as an error and is re-raised"""
+        started = time.perf_counter()
+        error = False
+        try:
+            yield
+        except Exception:
+            error = True
+            raise
+        finally:
+            # Control-flow exits such as Streamlit's st.stop() still count as normal runs
+            self.observe(stage, time.perf_counter() - started, error)
+    
+    def timed(self, stage: str):
+        """Decorator version of timer()"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+    
+    def observe(self, stage: str, seconds: float, error: bool = False):
+        """Record one timing for a stage"""
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = LatencyHistogram(self.window)
+            histogram.observe(seconds, error)
+    
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage count, errors, total seconds and p50/p95/p99, by stage name"""
+        with self._lock:
+            snapshot = {}
+            for stage, histogram in sorted(self._histograms.items()):
+                quantiles = histogram.quantiles()
+                snapshot[stage] = {
+                    'count': histogram.count,
+                    'errors': histogram.errors,
+                    'total_seconds': histogram.total,
+                    'p50': quantiles[0.5],
+                    'p95': quantiles[0.95],
+                    'p99': quantiles[0.99]
+                }
+            return snapshot
+    
+    def prometheus_text(self) -> str:
+        """Every stage as a Prometheus summary plus an error counter"""
+        lines = [
+            '# HELP moodify_stage_seconds Time spent in each processing stage',
+            '# TYPE moodify_stage_seconds summary'
+        ]
+        snapshot = self.snapshot()
+        for stage, values in snapshot.items():
+            label = self._label(stage)
+            for name, quantile in (('p50', '0.5'), ('p95', '0.95'), ('p99', '0.99')):
+                lines.append(f'moodify_stage_seconds{{stage="{label}",quantile="{quantile}"}} {values[name]:.6f}')
+            lines.append(f'moodify_stage_seconds_sum{{stage="{label}"}} {values["total_seconds"]:.6f}')
+            lines.append(f'moodify_stage_seconds_count{{stage="{label}"}} {values["count"]}')
+        
+        lines.append('# HELP moodify_stage_errors_total Stage runs that raised an exception')
+        lines.append('# TYPE moodify_stage_errors_total counter')
+        for stage, values in snapshot.items():
+            lines.append(f'moodify_stage_errors_total{{stage="{self._label(stage)}"}} {values["errors"]}')
+        return '\n'.join(lines) + '\n'
+    
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self._lock:
+            self._histograms.clear()
+    
+    @staticmethod
+    def _label(value: str) -> str:
+        """Escape a label value for the Prometheus text format"""
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
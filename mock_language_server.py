@@ -0,0 +1,237 @@
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+import logging
+from local_analyzer import LocalTextAnalyzer
+
+logger = logging.getLogger(__name__)
+
+class _BenchmarkHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer with a listen backlog deep enough for a concurrent benchmark"""
+    
+    # The default of 5 drops connection bursts, and clients only retry after a second
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class MockLanguageServer:
+    """Local stand-in for the Azure Language analyze-text REST endpoint.
+    
+    Answers the five synchronous tasks AzureTextAnalyzer uses (sentiment, key
+    phrases, entities, language and PII) from the local lexicon, so the app,
+    the batch tool and the benchmarks run without credentials. Every request
+    can be slowed down, failed with a 500 or throttled with a 429 to exercise
+    the rate limiter, circuit breaker, pool and hedging. Point AzureConfig at
+    `endpoint` with any key. Analyze-actions jobs are not supported.
+    """
+    
+    # Response kind for each task kind the service accepts
+    KINDS = {
+        'SentimentAnalysis': 'SentimentAnalysisResults',
+        'KeyPhraseExtraction': 'KeyPhraseExtractionResults',
+        'EntityRecognition': 'EntityRecognitionResults',
+        'LanguageDetection': 'LanguageDetectionResults',
+        'PiiEntityRecognition': 'PiiEntityRecognitionResults'
+    }
+    
+    _ENTITY_PATTERN = re.compile(r"(?<=[a-z,;] )[A-Z][a-z]+(?: [A-Z][a-z]+)*")
+    _PII_PATTERNS = (
+        ('Email', re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")),
+        ('PhoneNumber', re.compile(r"\+?\d[\d -]{7,}\d"))
+    )
+    
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, retry_after: float = 1.0, host: str = '127.0.0.1',
+                 port: int = 0, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.host = host
+        self.port = port
+        self.logger = logger
+        
+        self._local = LocalTextAnalyzer()
+        self._random = random.Random(seed)
+        self._server = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'documents': 0, 'throttled': 0, 'failed': 0}
+    
+    @property
+    def endpoint(self) -> str:
+        """URL to use as the Azure endpoint while the server is running"""
+        return f"http://{self.host}:{self.port}"
+    
+    def start(self) -> 'MockLanguageServer':
+        """Serve on a background thread; port 0 picks a free port"""
+        self._server = _BenchmarkHTTPServer((self.host, self.port), self._handler())
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True,
+                                        name="mock-language-server")
+        self._thread.start()
+        self.logger.info(f"Mock Azure Language server listening on {self.endpoint}")
+        return self
+    
+    def stop(self):
+        """Stop serving and close the socket"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+    
+    def serve_forever(self):
+        """Serve on the calling thread until interrupted"""
+        self.start()
+        try:
+            self._thread.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+    
+    def stats(self) -> Dict[str, int]:
+        """Requests and documents received, and how many were throttled or failed"""
+        with self._lock:
+            return dict(self._stats)
+    
+    def __enter__(self) -> 'MockLanguageServer':
+        """Start for the duration of a with block"""
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        """Stop at the end of a with block"""
+        self.stop()
+    
+    def respond(self, body: Dict) -> Dict:
+        """The JSON the real service would send back for one analyze-text request"""
+        kind = body.get('kind')
+        if kind not in self.KINDS:
+            raise ValueError(f"Unsupported task kind: {kind}")
+        documents = body.get('analysisInput', {}).get('documents', [])
+        results = {'documents': [], 'errors': [], 'modelVersion': 'mock'}
+        for document in documents:
+            text = document.get('text', '')
+            if not text.strip():
+                results['errors'].append({
+                    'id': document['id'],
+                    'error': {'code': 'InvalidArgument', 'message': 'Document text is empty.'}
+                })
+                continue
+            result = getattr(self, f'_{kind}')(text)
+            result.update({'id': document['id'], 'warnings': []})
+            results['documents'].append(result)
+        return {'kind': self.KINDS[kind], 'results': results}
+    
+    def _handler(self):
+        """Request handler class bound to this server's settings"""
+        mock = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; Nagle would hold the body back ~40ms
+            disable_nagle_algorithm = True
+            
+            def log_message(self, format, *args):
+                mock.logger.debug(format % args)
+            
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                status, headers, payload = mock._dispatch(self.path, body)
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+        
+        return Handler
+    
+    def _dispatch(self, path: str, body: Dict):
+        """Status, extra headers and JSON body for one request, after the injected delay"""
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['documents'] += len(body.get('analysisInput', {}).get('documents', []))
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            roll = self._random.random()
+        if delay > 0:
+            time.sleep(delay)
+        
+        if not path.startswith('/language/:analyze-text'):
+            return 404, {}, self._error('NotFound', f"No mock for {path}")
+        if roll < self.throttle_rate:
+            self._count('throttled')
+            return 429, {'Retry-After': f"{self.retry_after:g}"}, self._error(
+                '429', 'Rate limit is exceeded. Try again later.')
+        if roll < self.throttle_rate + self.error_rate:
+            self._count('failed')
+            return 500, {}, self._error('InternalServerError', 'Injected failure.')
+        try:
+            return 200, {}, self.respond(body)
+        except ValueError as e:
+            return 400, {}, self._error('InvalidRequest', str(e))
+    
+    def _count(self, name: str):
+        """Bump one of the stats counters"""
+        with self._lock:
+            self._stats[name] += 1
+    
+    @staticmethod
+    def _error(code: str, message: str) -> Dict:
+        """Azure's error envelope"""
+        return {'error': {'code': code, 'message': message}}
+    
+    # One method per task kind, each returning a document result without id/warnings
+    def _SentimentAnalysis(self, text: str) -> Dict:
+        sentiment = self._local.analyze_text_comprehensive(text, ['sentiment'])['sentiment']
+        scores = sentiment['scores']
+        label = sentiment['label']
+        return {
+            'sentiment': label,
+            'confidenceScores': scores,
+            'sentences': [{
+                'text': text,
+                # Only whole documents can be mixed
+                'sentiment': 'neutral' if label == 'mixed' else label,
+                'confidenceScores': scores,
+                'offset': 0,
+                'length': len(text)
+            }]
+        }
+    
+    def _KeyPhraseExtraction(self, text: str) -> Dict:
+        return {'keyPhrases': self._local.analyze_text_comprehensive(text, ['key_phrases'])['key_phrases']}
+    
+    def _EntityRecognition(self, text: str) -> Dict:
+        entities = [self._entity(match, 'Person') for match in self._ENTITY_PATTERN.finditer(text)]
+        return {'entities': entities}
+    
+    def _LanguageDetection(self, text: str) -> Dict:
+        return {'detectedLanguage': {'name': 'English', 'iso6391Name': 'en', 'confidenceScore': 1.0}}
+    
+    def _PiiEntityRecognition(self, text: str) -> Dict:
+        entities = [self._entity(match, category)
+                    for category, pattern in self._PII_PATTERNS for match in pattern.finditer(text)]
+        redacted = text
+        for entity in entities:
+            start = entity['offset']
+            redacted = redacted[:start] + '*' * entity['length'] + redacted[start + entity['length']:]
+        return {'entities': entities, 'redactedText': redacted}
+    
+    @staticmethod
+    def _entity(match, category: str) -> Dict:
+        """An entity in the service's JSON shape from a regex match"""
+        return {
+            'text': match.group(),
+            'category': category,
+            'offset': match.start(),
+            'length': len(match.group()),
+            'confidenceScore': 0.9
+        }
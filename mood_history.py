@@ -0,0 +1,188 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Mapping, Optional
+import logging
+import numpy as np
+from emotion_analyzer import EmotionAnalyzer
+
+logger = logging.getLogger(__name__)
+
+class MoodHistory:
+    """Append-only per-user mood log in SQLite with vectorized rolling aggregations.
+    
+    Each entry keeps the time, the primary emotion, the sentiment scores and
+    the keyword count for every emotion, one column each, so a user's history
+    loads straight into numpy arrays. Recently queried users stay in memory
+    until their next entry, which lets a chart re-query on every rerun.
+    """
+    
+    EMOTIONS = list(EmotionAnalyzer.EMOTION_KEYWORDS) + ['neutral']
+    SCORE_NAMES = ('positive', 'neutral', 'negative')
+    
+    DAY = 24 * 3600
+    
+    def __init__(self, db_path: str = 'moodify_history.db', max_cached_users: int = 256):
+        self.db_path = db_path
+        self.max_cached_users = max_cached_users
+        self.logger = logger
+        
+        self._lock = threading.Lock()
+        self._arrays = OrderedDict()  # user_id -> column arrays, least recently used first
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        keyword_columns = ''.join(f", kw_{emotion} INTEGER NOT NULL DEFAULT 0"
+                                  for emotion in EmotionAnalyzer.EMOTION_KEYWORDS)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS moods ("
+            "user_id TEXT NOT NULL, ts REAL NOT NULL, emotion TEXT NOT NULL, "
+            "positive REAL NOT NULL, neutral REAL NOT NULL, negative REAL NOT NULL"
+            f"{keyword_columns})"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_moods_user_ts ON moods (user_id, ts)")
+        # Emotions added to the lexicon after the table was created get their column now
+        existing = {row[1] for row in self._db.execute("PRAGMA table_info(moods)")}
+        for emotion in EmotionAnalyzer.EMOTION_KEYWORDS:
+            if f"kw_{emotion}" not in existing:
+                self._db.execute(f"ALTER TABLE moods ADD COLUMN kw_{emotion} INTEGER NOT NULL DEFAULT 0")
+        self._db.commit()
+        logger.info(f"Recording mood history in {db_path}")
+    
+    @classmethod
+    def from_env(cls) -> Optional['MoodHistory']:
+        """History store at MOODIFY_HISTORY_DB, or None when history is switched off"""
+        db_path = os.getenv("MOODIFY_HISTORY_DB")
+        return cls(db_path) if db_path else None
+    
+    def record(self, user_id: str, emotion: str, analysis_results: Mapping,
+               breakdown: Optional[Mapping[str, int]] = None, timestamp: Optional[float] = None):
+        """Append one analysis to the user's history"""
+        sentiment = analysis_results.get('sentiment') or {}
+        scores = sentiment.get('scores') or {}
+        if breakdown is None:
+            breakdown = EmotionAnalyzer.get_emotion_breakdown(analysis_results)
+        row = [user_id, time.time() if timestamp is None else timestamp, emotion]
+        row += [float(scores.get(name, 0.0)) for name in self.SCORE_NAMES]
+        row += [int(breakdown.get(name, 0)) for name in EmotionAnalyzer.EMOTION_KEYWORDS]
+        columns = ', '.join(f"kw_{emotion}" for emotion in EmotionAnalyzer.EMOTION_KEYWORDS)
+        with self._lock:
+            self._db.execute(
+                f"INSERT INTO moods (user_id, ts, emotion, positive, neutral, negative, {columns}) "
+                f"VALUES ({', '.join('?' * len(row))})", row
+            )
+            self._db.commit()
+            self._arrays.pop(user_id, None)
+    
+    def entries(self, user_id: str, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """The user's history as column arrays, oldest first.
+        
+        'ts' holds timestamps, 'emotion' emotion indexes into EMOTIONS, 'scores'
+        an (entries x positive/neutral/negative) array and 'breakdown' an
+        (entries x emotions) keyword count array.
+        """
+        arrays = self._load(user_id)
+        first, last = self._bounds(arrays['ts'], since, until)
+        return {name: values[first:last] for name, values in arrays.items()}
+    
+    def rolling_average(self, user_id: str, window: float = 7 * DAY, since: Optional[float] = None,
+                        until: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Mean sentiment scores over the `window` seconds up to and including each entry"""
+        arrays = self._load(user_id)
+        ts = arrays['ts']
+        first, last = self._bounds(ts, since, until)
+        # Prefix sums turn every window mean into one subtraction
+        totals = np.vstack([np.zeros((1, 3)), np.cumsum(arrays['scores'], axis=0)])
+        ends = np.arange(first, last) + 1
+        starts = np.searchsorted(ts, ts[first:last] - window, side='right')
+        means = (totals[ends] - totals[starts]) / (ends - starts)[:, None]
+        result = {'ts': ts[first:last]}
+        for column, name in enumerate(self.SCORE_NAMES):
+            result[name] = means[:, column]
+        return result
+    
+    def emotion_frequency(self, user_id: str, bucket: float = DAY, since: Optional[float] = None,
+                          until: Optional[float] = None) -> Dict:
+        """How often each primary emotion came up per `bucket` seconds (buckets x EMOTIONS counts)"""
+        history = self.entries(user_id, since, until)
+        ts = history['ts']
+        if not len(ts):
+            return {'bucket_start': np.array([]), 'emotions': list(self.EMOTIONS),
+                    'counts': np.zeros((0, len(self.EMOTIONS)), dtype=np.int64)}
+        origin = np.floor((ts[0] if since is None else since) / bucket) * bucket
+        buckets = ((ts - origin) // bucket).astype(np.int64)
+        count = int(buckets[-1]) + 1
+        counts = np.bincount(buckets * len(self.EMOTIONS) + history['emotion'],
+                             minlength=count * len(self.EMOTIONS)).reshape(count, len(self.EMOTIONS))
+        return {'bucket_start': origin + np.arange(count) * bucket, 'emotions': list(self.EMOTIONS),
+                'counts': counts}
+    
+    def trend(self, user_id: str, since: Optional[float] = None, until: Optional[float] = None) -> Dict:
+        """Least-squares line through net sentiment (positive - negative) over time.
+        
+        'slope_per_day' is the change in net sentiment per day; 'fitted' has
+        the line's value at each entry's 'ts'. Fewer than two entries give a
+        slope of 0.
+        """
+        history = self.entries(user_id, since, until)
+        ts = history['ts']
+        net = history['scores'][:, 0] - history['scores'][:, 2]
+        if len(ts) < 2 or ts[-1] == ts[0]:
+            level = float(net.mean()) if len(net) else 0.0
+            return {'slope_per_day': 0.0, 'intercept': level, 'ts': ts, 'fitted': np.full(len(ts), level)}
+        days = (ts - ts[0]) / self.DAY
+        slope, intercept = np.polyfit(days, net, 1)
+        return {'slope_per_day': float(slope), 'intercept': float(intercept), 'ts': ts,
+                'fitted': intercept + slope * days}
+    
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._db.close()
+    
+    @staticmethod
+    def _bounds(ts: np.ndarray, since: Optional[float], until: Optional[float]):
+        """Index range of the entries between since and until"""
+        first = 0 if since is None else int(np.searchsorted(ts, since, side='left'))
+        last = len(ts) if until is None else int(np.searchsorted(ts, until, side='left'))
+        return first, last
+    
+    def _load(self, user_id: str) -> Dict[str, np.ndarray]:
+        """All of a user's entries as arrays, from memory or with one indexed query"""
+        with self._lock:
+            arrays = self._arrays.get(user_id)
+            if arrays is not None:
+                self._arrays.move_to_end(user_id)
+                return arrays
+            
+            columns = ', '.join(f"kw_{emotion}" for emotion in EmotionAnalyzer.EMOTION_KEYWORDS)
+            rows = self._db.execute(
+                f"SELECT ts, emotion, positive, neutral, negative, {columns} "
+                "FROM moods WHERE user_id = ? ORDER BY ts", (user_id,)
+            ).fetchall()
+            arrays = self._to_arrays(rows)
+            self._arrays[user_id] = arrays
+            while len(self._arrays) > self.max_cached_users:
+                self._arrays.popitem(last=False)
+            return arrays
+    
+    def _to_arrays(self, rows: List[tuple]) -> Dict[str, np.ndarray]:
+        """Turn query rows into the column arrays entries() documents"""
+        emotion_index = {emotion: i for i, emotion in enumerate(self.EMOTIONS)}
+        neutral = emotion_index['neutral']
+        if not rows:
+            return {'ts': np.zeros(0), 'emotion': np.zeros(0, dtype=np.int64), 'scores': np.zeros((0, 3)),
+                    'breakdown': np.zeros((0, len(EmotionAnalyzer.EMOTION_KEYWORDS)), dtype=np.int64)}
+        ts, emotions, *numbers = zip(*rows)
+        numeric = np.array(numbers, dtype=np.float64).T
+        arrays = {
+            'ts': np.array(ts, dtype=np.float64),
+            'emotion': np.array([emotion_index.get(emotion, neutral) for emotion in emotions], dtype=np.int64),
+            'scores': numeric[:, :3],
+            'breakdown': numeric[:, 3:].astype(np.int64)
+        }
+        # Shared with every later query until the next record(), so nobody may edit them
+        for values in arrays.values():
+            values.setflags(write=False)
+        return arrays
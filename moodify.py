@@ -0,0 +1,341 @@
+"""Command line tools for Moodify.
+
+    python moodify.py batch responses.jsonl -o moods.jsonl
+    python moodify.py mock-server --port 5055 --latency 0.1
+    python moodify.py bench -o bench.json --baseline previous.json
+    python moodify.py load-test --sessions 20 -o load.json
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+from config import AzureConfig
+from azure_service import AzureTextAnalyzer
+from benchmark import BenchmarkSuite
+from emotion_analyzer import EmotionAnalyzer
+from load_test import LoadTest
+from metrics import MetricsRegistry
+from mock_language_server import MockLanguageServer
+from rate_limit import RateLimiter
+from recommend import RecommendationEngine
+
+def read_records(path: str, text_field: str = 'text', skip: int = 0) -> Iterator[Dict]:
+    """Stream records from a JSONL or CSV file, skipping the first `skip` of them"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.csv'):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        
+        for index, row in enumerate(rows):
+            if index < skip:
+                continue
+            # A missing, null or non-text field becomes '' so it gets the usual per-document error
+            if not isinstance(row.get(text_field), str):
+                row[text_field] = ''
+            yield row
+
+def chunked(items: Iterable, size: int) -> Iterator[List]:
+    """Group an iterable into lists of at most `size` items"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def analyze_batches(analyzer: AzureTextAnalyzer, batches: Iterable[List[Dict]], text_field: str,
+                    features: Optional[List[str]], workers: int) -> Iterator[Tuple[List[Dict], List[Dict]]]:
+    """Analyze batches on a thread pool, keeping at most `workers` in flight and yielding in order"""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for batch in batches:
+            texts = [record[text_field] for record in batch]
+            in_flight.append((batch, executor.submit(analyzer.analyze_texts_batch, texts, features)))
+            if len(in_flight) >= workers:
+                batch, future = in_flight.popleft()
+                yield batch, future.result()
+        while in_flight:
+            batch, future = in_flight.popleft()
+            yield batch, future.result()
+
+def score_batch(batch: List[Dict], results: List[Dict], id_field: str, rec_type: str,
+                first_index: int) -> List[Dict]:
+    """Attach emotion, confidence and a recommendation to each analyzed record"""
+    scored = EmotionAnalyzer.analyze_emotions_batch(results)
+    output = []
+    for offset, (record, analysis) in enumerate(zip(batch, results)):
+        emotion = scored['emotions'][offset]
+        row = {'id': record.get(id_field, first_index + offset)}
+        row.update(analysis)
+        row['emotion'] = emotion
+        row['confidence'] = float(scored['confidence'][offset])
+        row['recommendation'] = RecommendationEngine.get_recommendation(emotion, rec_type)
+        output.append(row)
+    return output
+
+def load_checkpoint(path: str) -> Dict:
+    """Read how far a previous run got"""
+    if not os.path.exists(path):
+        return {'records': 0, 'output_bytes': 0}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def save_checkpoint(path: str, records: int, output_bytes: int):
+    """Record progress atomically so a crash never leaves a half-written checkpoint"""
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'records': records, 'output_bytes': output_bytes}, f)
+    os.replace(temp_path, path)
+
+def run_batch(args) -> int:
+    """Stream the input file through Azure, emotion scoring and recommendations into JSONL"""
+    checkpoint_path = args.checkpoint or args.output + '.checkpoint'
+    checkpoint = load_checkpoint(checkpoint_path) if args.resume else {'records': 0, 'output_bytes': 0}
+    done = checkpoint['records']
+    if done:
+        print(f"Resuming after {done} records", file=sys.stderr)
+    
+    config = AzureConfig.from_env()
+    limiter = RateLimiter.for_tier(config.tier, config.requests_per_minute, len(config.resources))
+    analyzer = AzureTextAnalyzer(config, rate_limiter=limiter)
+    records = read_records(args.input, args.text_field, skip=done)
+    batches = chunked(records, args.batch_size)
+    
+    # Drop anything written after the last checkpoint so resumed output has no duplicates
+    mode = 'r+b' if done and os.path.exists(args.output) else 'wb'
+    started = time.time()
+    processed = 0
+    last_report = 0.0
+    with open(args.output, mode) as out:
+        out.truncate(checkpoint['output_bytes'] if mode == 'r+b' else 0)
+        out.seek(0, os.SEEK_END)
+        
+        for batch, results in analyze_batches(analyzer, batches, args.text_field, args.features, args.workers):
+            with MetricsRegistry.default().timer('score_batch'):
+                rows = score_batch(batch, results, args.id_field, args.rec_type, done)
+            for row in rows:
+                out.write((json.dumps(row, ensure_ascii=False) + '\n').encode('utf-8'))
+            out.flush()
+            done += len(batch)
+            processed += len(batch)
+            save_checkpoint(checkpoint_path, done, out.tell())
+            
+            now = time.time()
+            if now - last_report >= 1:
+                rate = processed / max(now - started, 1e-9)
+                print(f"\r{done} records done, {rate:.1f} records/s", end='', file=sys.stderr)
+                last_report = now
+    
+    elapsed = time.time() - started
+    print(f"\rFinished {done} records ({processed} this run) in {elapsed:.1f}s", file=sys.stderr)
+    stats = limiter.stats()
+    print(f"Azure calls: {stats['calls']}, throttled: {stats['throttled']}, retried: {stats['retried']}",
+          file=sys.stderr)
+    pool = analyzer.client_factory.stats()
+    print(f"HTTP requests: {pool['sync_requests']}, connections opened: {pool['sync_connections_opened']}, "
+          f"reused: {pool['reuse_ratio']:.0%}", file=sys.stderr)
+    if args.metrics:
+        with open(args.metrics, 'w', encoding='utf-8') as f:
+            f.write(MetricsRegistry.default().prometheus_text())
+    return 0
+
+def mock_server_from_args(args, port: int = 0) -> MockLanguageServer:
+    """A mock Azure Language server with the fault injection asked for on the command line"""
+    return MockLanguageServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                              throttle_rate=args.throttle_rate, retry_after=args.retry_after,
+                              port=port, seed=args.seed)
+
+def run_mock_server(args) -> int:
+    """Serve the mock Azure Language endpoint until interrupted"""
+    mock = mock_server_from_args(args, args.port)
+    print(f"Mock Azure Language server on http://127.0.0.1:{args.port or '<random port>'} - "
+          f"set AZURE_LANGUAGE_ENDPOINT to it and any 32 character key. Ctrl+C stops it.", file=sys.stderr)
+    mock.serve_forever()
+    return 0
+
+def run_bench(args) -> int:
+    """Benchmark the pipeline against the mock server (or Azure with --live) and write JSON"""
+    mock = None
+    if args.live:
+        config = AzureConfig.from_env()
+    else:
+        mock = mock_server_from_args(args).start()
+        config = AzureConfig(endpoint=mock.endpoint, key='mock' * 8, timeout=30)
+    # Against the mock only our own code should be the bottleneck, not the tier's quota
+    rpm = args.rpm or (config.requests_per_minute if args.live else 600000)
+    limiter = RateLimiter.for_tier(config.tier, rpm, len(config.resources))
+    analyzer = AzureTextAnalyzer(config, mode=args.mode, rate_limiter=limiter)
+    
+    texts = None
+    if args.input:
+        texts = [str(record[args.text_field]) for record in read_records(args.input, args.text_field)]
+    suite = BenchmarkSuite(analyzer, texts, iterations=args.iterations, batch_size=args.batch_size,
+                           concurrency=args.concurrency, rec_type=args.rec_type)
+    try:
+        scenarios = suite.run(args.scenarios)
+    finally:
+        analyzer.close()
+        if mock:
+            mock.stop()
+    
+    report = {
+        'environment': BenchmarkSuite.environment(),
+        'settings': {
+            'target': 'azure' if args.live else 'mock', 'mode': args.mode, 'iterations': args.iterations,
+            'batch_size': args.batch_size, 'concurrency': args.concurrency, 'latency': args.latency,
+            'jitter': args.jitter, 'error_rate': args.error_rate, 'throttle_rate': args.throttle_rate
+        },
+        'scenarios': scenarios,
+        'rate_limiter': limiter.stats()
+    }
+    if mock:
+        report['mock_server'] = mock.stats()
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    
+    for name, result in scenarios.items():
+        print(f"{name:<22} {result['throughput']:>10.1f}/s  p50 {result['p50_ms']:>8.2f}ms  "
+              f"p99 {result['p99_ms']:>8.2f}ms  errors {result['errors']}", file=sys.stderr)
+    
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['scenarios']
+        regressions = BenchmarkSuite.compare(baseline, scenarios, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+def run_load_test(args) -> int:
+    """Drive simulated sessions through the Streamlit app and write the results as JSON"""
+    mock = None
+    if not args.live:
+        mock = mock_server_from_args(args).start()
+        # Environment variables win over .env, so the app's cached analyzer talks to the mock
+        os.environ.update({'AZURE_LANGUAGE_ENDPOINT': mock.endpoint, 'AZURE_LANGUAGE_KEY': 'mock' * 8,
+                           'AZURE_LANGUAGE_ENDPOINTS': '', 'AZURE_LANGUAGE_KEYS': ''})
+    # The app logs every analysis at INFO, which would drown the output
+    logging.getLogger().setLevel(logging.WARNING)
+    
+    texts = None
+    if args.input:
+        texts = [str(record[args.text_field]) for record in read_records(args.input, args.text_field)]
+    load_test = LoadTest(args.app, sessions=args.sessions, rounds=args.rounds, think_time=args.think_time,
+                         texts=texts, seed=args.seed)
+    try:
+        results = load_test.run()
+    finally:
+        if mock:
+            mock.stop()
+    
+    report = {'environment': BenchmarkSuite.environment(), 'target': 'azure' if args.live else 'mock',
+              'results': results}
+    if mock:
+        report['mock_server'] = mock.stats()
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    
+    print(f"{results['sessions']} sessions: {results['reruns_per_second']:.1f} reruns/s, "
+          f"rerun p50 {results['rerun_p50_ms']:.0f}ms p99 {results['rerun_p99_ms']:.0f}ms, "
+          f"{results['errors']} errors, session state +{results['session_state_bytes']['mean_growth'] / 1024:.1f} KiB "
+          f"per session", file=sys.stderr)
+    return 1 if results['errors'] else 0
+
+def add_fault_arguments(parser: argparse.ArgumentParser):
+    """Latency and failure injection options shared by mock-server and bench"""
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every mock response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Up to this many random extra seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests failing with a 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Share of requests answered with a 429')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After seconds sent with a 429')
+    parser.add_argument('--seed', type=int, help='Random seed for repeatable fault injection')
+
+def build_parser() -> argparse.ArgumentParser:
+    """Command line arguments for every subcommand"""
+    parser = argparse.ArgumentParser(prog='moodify', description='Moodify command line tools')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    
+    batch = subcommands.add_parser('batch', help='Analyze a JSONL or CSV file of texts')
+    batch.add_argument('input', help='JSONL or CSV file with one text per record')
+    batch.add_argument('-o', '--output', required=True, help='JSONL file to write results to')
+    batch.add_argument('--text-field', default='text', help='Field holding the text (default: text)')
+    batch.add_argument('--id-field', default='id', help='Field copied to the output as id (default: id)')
+    batch.add_argument('--features', nargs='+', choices=list(AzureTextAnalyzer.FEATURES),
+                       default=['sentiment', 'key_phrases'], help='Azure features to compute')
+    batch.add_argument('--rec-type', default='songs', choices=RecommendationEngine.get_available_types(),
+                       help='Recommendation type to attach (default: songs)')
+    batch.add_argument('--batch-size', type=int, default=25, help='Records per Azure batch (default: 25)')
+    batch.add_argument('--workers', type=int, default=4, help='Batches in flight at once (default: 4)')
+    batch.add_argument('--checkpoint', help='Checkpoint file (default: OUTPUT.checkpoint)')
+    batch.add_argument('--resume', action='store_true', help='Continue from the checkpoint')
+    batch.add_argument('--metrics', help='Write per-stage latencies here in Prometheus text format')
+    batch.set_defaults(handler=run_batch)
+    
+    mock = subcommands.add_parser('mock-server', help='Serve a local stand-in for the Azure Language API')
+    mock.add_argument('--port', type=int, default=5055, help='Port to listen on (default: 5055)')
+    add_fault_arguments(mock)
+    mock.set_defaults(handler=run_mock_server)
+    
+    bench = subcommands.add_parser('bench', help='Measure throughput and p50/p99 latency of the pipeline')
+    bench.add_argument('-o', '--output', help='JSON file to write results to (default: stdout)')
+    bench.add_argument('--live', action='store_true', help='Benchmark the Azure resource from .env, not the mock')
+    bench.add_argument('--scenarios', nargs='+', metavar='STAGE.MODE',
+                       help='Scenarios to run, e.g. analyze.batch emotion.single (default: all)')
+    bench.add_argument('--iterations', type=int, default=100, help='Calls per scenario (default: 100)')
+    bench.add_argument('--batch-size', type=int, default=10, help='Items per call in batch mode (default: 10)')
+    bench.add_argument('--concurrency', type=int, default=8, help='Threads in concurrent mode (default: 8)')
+    bench.add_argument('--mode', default='sequential', choices=AzureTextAnalyzer.MODES,
+                       help='How the analyzer calls Azure (default: sequential)')
+    bench.add_argument('--rpm', type=float, help='Client-side rate limit (default: tier limit, unlimited for mock)')
+    bench.add_argument('--input', help='JSONL or CSV file of texts to use instead of the built-in samples')
+    bench.add_argument('--text-field', default='text', help='Field holding the text (default: text)')
+    bench.add_argument('--rec-type', default='songs', choices=RecommendationEngine.get_available_types(),
+                       help='Recommendation type to benchmark (default: songs)')
+    bench.add_argument('--baseline', help='Earlier bench JSON; exit 1 if any scenario regressed')
+    bench.add_argument('--tolerance', type=float, default=0.2,
+                       help='Allowed p99 growth / throughput drop against the baseline (default: 0.2)')
+    add_fault_arguments(bench)
+    bench.set_defaults(handler=run_bench)
+    
+    load = subcommands.add_parser('load-test', help='Drive simulated user sessions through the Streamlit app')
+    load.add_argument('-o', '--output', help='JSON file to write results to (default: stdout)')
+    load.add_argument('--app', default='main.py', help='Streamlit script to load (default: main.py)')
+    load.add_argument('--sessions', type=int, default=10, help='Simulated users (default: 10)')
+    load.add_argument('--rounds', type=int, default=5,
+                      help='Type/analyze/toggle rounds per session (default: 5)')
+    load.add_argument('--think-time', type=float, default=0.0,
+                      help='Average seconds a user pauses between actions (default: 0)')
+    load.add_argument('--live', action='store_true', help='Let the app use the Azure resource from .env')
+    load.add_argument('--input', help='JSONL or CSV file of texts for the sessions to type')
+    load.add_argument('--text-field', default='text', help='Field holding the text (default: text)')
+    add_fault_arguments(load)
+    load.set_defaults(handler=run_load_test)
+    
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Parse the command line and run the chosen subcommand"""
+    logging.basicConfig(level=logging.WARNING)
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
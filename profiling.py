@@ -0,0 +1,77 @@
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import time
+from typing import Callable, Mapping, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RerunProfiler:
+    """Profiles a Streamlit rerun with cProfile when an admin asks for it.
+    
+    MOODIFY_PROFILE=1 profiles every rerun (for local digging). In production set
+    MOODIFY_PROFILE_TOKEN and open the app with ?profile=<token> to profile one
+    rerun. Reports go to MOODIFY_PROFILE_DIR as a .prof file (for pstats or
+    snakeviz) and a .txt summary. When neither is set reruns run exactly as before.
+    """
+    
+    def __init__(self, output_dir: str = 'profiles', always: bool = False, token: Optional[str] = None,
+                 top: int = 40):
+        self.output_dir = output_dir
+        self.always = always
+        self.token = token
+        self.top = top
+        self.logger = logger
+    
+    @classmethod
+    def from_env(cls) -> 'RerunProfiler':
+        """Build a profiler from MOODIFY_PROFILE* environment variables"""
+        return cls(
+            output_dir=os.getenv("MOODIFY_PROFILE_DIR", "profiles"),
+            always=os.getenv("MOODIFY_PROFILE", "").lower() in ("1", "true", "yes"),
+            token=os.getenv("MOODIFY_PROFILE_TOKEN") or None
+        )
+    
+    @property
+    def enabled(self) -> bool:
+        """False means requested() is always False"""
+        return self.always or self.token is not None
+    
+    def requested(self, query_params: Mapping[str, str]) -> bool:
+        """Whether this rerun should be profiled"""
+        if self.always:
+            return True
+        if self.token is None:
+            return False
+        given = query_params.get('profile', '')
+        # Constant-time comparison so the token can't be guessed a character at a time
+        return bool(given) and hmac.compare_digest(given.encode(), self.token.encode())
+    
+    def run(self, func: Callable) -> str:
+        """Run func under cProfile, write the reports and return the .prof path"""
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            func()
+        finally:
+            profile.disable()
+            path = self._write(profile)
+        return path
+    
+    def _write(self, profile: cProfile.Profile) -> str:
+        """Save the raw profile and a cumulative-time summary next to it"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S') + f"{time.time() % 1:.3f}"[1:]
+        base = os.path.join(self.output_dir, f"rerun-{stamp}-{os.getpid()}")
+        profile.dump_stats(base + '.prof')
+        
+        summary = io.StringIO()
+        pstats.Stats(profile, stream=summary).sort_stats('cumulative').print_stats(self.top)
+        with open(base + '.txt', 'w', encoding='utf-8') as f:
+            f.write(summary.getvalue())
+        
+        self.logger.info(f"Wrote rerun profile to {base}.prof")
+        return base + '.prof'
@@ -0,0 +1,229 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+import logging
+from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
+
+logger = logging.getLogger(__name__)
+
+# Requests per minute each Azure AI Language pricing tier allows
+TIER_REQUESTS_PER_MINUTE = {
+    'F0': 100,
+    'S': 1000
+}
+
+class TokenBucket:
+    """Thread-safe token bucket; callers reserve a token and wait out any debt"""
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+    
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take tokens now and return how many seconds to wait before using them"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            debt_wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(debt_wait, self._paused_until - now)
+    
+    def try_reserve(self, tokens: float = 1.0) -> bool:
+        """Take tokens only if they are there right now, without going into debt"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return False
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            return True
+    
+    def available(self) -> float:
+        """Tokens that could be taken right now without waiting (0 while paused)"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return 0.0
+            return min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+    
+    def pause(self, seconds: float):
+        """Hold every caller back, e.g. after the service asked us to retry later"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter that defers to the service's Retry-After"""
+    
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+    
+    def __init__(self, max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+    
+    def is_retryable(self, error: Exception) -> bool:
+        """Throttling, transient server errors and connection problems are worth retrying"""
+        if isinstance(error, HttpResponseError) and error.status_code is not None:
+            return error.status_code in self.RETRY_STATUS_CODES
+        return isinstance(error, (ServiceRequestError, ServiceResponseError))
+    
+    def delay(self, attempt: int, error: Exception) -> float:
+        """Seconds to wait before retry number `attempt` (starting at 1)"""
+        retry_after = self.retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+    
+    @staticmethod
+    def retry_after(error: Exception) -> Optional[float]:
+        """Read the wait the service asked for from the response headers, if any"""
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None)
+        if not headers:
+            return None
+        
+        for header in ('retry-after-ms', 'x-ms-retry-after-ms'):
+            value = headers.get(header)
+            if value:
+                try:
+                    return float(value) / 1000
+                except ValueError:
+                    pass
+        
+        value = headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return None
+
+
+class RateLimiter:
+    """Keeps Azure calls under the tier's request rate and retries throttled ones"""
+    
+    def __init__(self, requests_per_minute: float, retry_policy: Optional[RetryPolicy] = None):
+        self.requests_per_minute = requests_per_minute
+        self.bucket = TokenBucket(requests_per_minute / 60)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.logger = logger
+        
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'documents': 0, 'throttled': 0, 'retried': 0, 'failed': 0, 'wait_seconds': 0.0}
+    
+    @classmethod
+    def for_tier(cls, tier: str, requests_per_minute: Optional[float] = None,
+                 resources: int = 1) -> 'RateLimiter':
+        """Limiter for a pricing tier, optionally overriding its per-resource request rate.
+        
+        Every resource has its own quota, so the allowed rate grows with `resources`.
+        """
+        if requests_per_minute is None:
+            if tier not in TIER_REQUESTS_PER_MINUTE:
+                raise ValueError(f"Unknown Azure Language tier: {tier}")
+            requests_per_minute = TIER_REQUESTS_PER_MINUTE[tier]
+        return cls(requests_per_minute * resources)
+    
+    def call(self, func: Callable, documents: int = 1):
+        """Run a blocking Azure call under the rate limit, retrying transient failures"""
+        attempt = 0
+        while True:
+            self._wait(self.bucket.reserve())
+            self._count('calls', 1)
+            self._count('documents', documents)
+            try:
+                return func()
+            except Exception as e:
+                attempt += 1
+                delay = self._on_error(e, attempt)
+                if delay is None:
+                    raise
+                self._wait(delay)
+    
+    async def acall(self, func: Callable, documents: int = 1):
+        """Async twin of call() for coroutine functions"""
+        attempt = 0
+        while True:
+            wait = self.bucket.reserve()
+            if wait > 0:
+                self._count('wait_seconds', wait)
+                await asyncio.sleep(wait)
+            self._count('calls', 1)
+            self._count('documents', documents)
+            try:
+                return await func()
+            except Exception as e:
+                attempt += 1
+                delay = self._on_error(e, attempt)
+                if delay is None:
+                    raise
+                self._count('wait_seconds', delay)
+                await asyncio.sleep(delay)
+    
+    def try_acquire(self, documents: int = 1) -> bool:
+        """Count an extra request against the limit if it fits right now; never waits.
+        
+        For optional requests like hedges, which are better skipped than queued.
+        """
+        if not self.bucket.try_reserve():
+            return False
+        self._count('calls', 1)
+        self._count('documents', documents)
+        return True
+    
+    def charge(self, requests: int = 1):
+        """Count requests someone else already sent (e.g. SDK status polls) against the limit.
+        
+        Never waits; the tokens go into debt, so the next callers wait instead.
+        """
+        self.bucket.reserve(requests)
+        self._count('calls', requests)
+    
+    def stats(self) -> Dict[str, float]:
+        """Calls, documents, throttled responses, retries, failures and time spent waiting"""
+        with self._lock:
+            return dict(self._stats)
+    
+    def _on_error(self, error: Exception, attempt: int) -> Optional[float]:
+        """Decide whether to retry; returns the delay, or None to give up"""
+        if isinstance(error, HttpResponseError) and error.status_code == 429:
+            self._count('throttled', 1)
+            # Everyone backs off, not just this caller
+            retry_after = self.retry_policy.retry_after(error)
+            if retry_after:
+                self.bucket.pause(retry_after)
+        
+        if attempt > self.retry_policy.max_retries or not self.retry_policy.is_retryable(error):
+            self._count('failed', 1)
+            return None
+        
+        delay = self.retry_policy.delay(attempt, error)
+        self._count('retried', 1)
+        self.logger.warning(f"Azure call failed ({error}), retry {attempt} in {delay:.2f}s")
+        return delay
+    
+    def _wait(self, seconds: float):
+        """Sleep and record the time spent waiting"""
+        if seconds > 0:
+            self._count('wait_seconds', seconds)
+            time.sleep(seconds)
+    
+    def _count(self, name: str, amount: float):
+        """Bump a counter"""
+        with self._lock:
+            self._stats[name] += amount
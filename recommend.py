@@ -1,8 +1,13 @@
 import random
 from typing import Dict, List, Optional
+from recommendation_catalog import RecommendationCatalog
 
 class RecommendationEngine:
-    """Handles mood-based recommendations"""
+    """Handles mood-based recommendations
+    
+    RECOMMENDATIONS is the built-in catalog, used unless MOODIFY_RECOMMENDATIONS
+    points at a JSON or SQLite one; lookups go through RecommendationCatalog.
+    """
     
     RECOMMENDATIONS = {
         "joy": {
@@ -177,10 +182,11 @@ class RecommendationEngine:
         if not emotion or not rec_type:
             return "Please specify both emotion and recommendation type"
         
-        if emotion not in RecommendationEngine.RECOMMENDATIONS:
+        catalog = RecommendationCatalog.default()
+        if not catalog.has_emotion(emotion):
             return f"No recommendations available for emotion: {emotion}"
         
-        recommendations = RecommendationEngine.RECOMMENDATIONS[emotion].get(rec_type, [])
+        recommendations = catalog.lookup(emotion, rec_type)
         
         if not recommendations:
             return f"No {rec_type} recommendations available for {emotion}"
@@ -190,11 +196,8 @@ class RecommendationEngine:
     @staticmethod
     def get_all_recommendations(emotion: str) -> Dict[str, str]:
         """Get one recommendation of each type for an emotion"""
-        return {
-            'songs': RecommendationEngine.get_recommendation(emotion, 'songs'),
-            'quotes': RecommendationEngine.get_recommendation(emotion, 'quotes'),
-            'activities': RecommendationEngine.get_recommendation(emotion, 'activities')
-        }
+        return {rec_type: RecommendationEngine.get_recommendation(emotion, rec_type)
+                for rec_type in RecommendationCatalog.default().types()}
     
     @staticmethod
     def add_custom_recommendation(emotion: str, rec_type: str, recommendation: str) -> bool:
@@ -202,20 +205,14 @@ class RecommendationEngine:
         if not all([emotion, rec_type, recommendation]):
             return False
             
-        emotion = emotion.lower()
-        
-        if emotion in RecommendationEngine.RECOMMENDATIONS:
-            if rec_type in RecommendationEngine.RECOMMENDATIONS[emotion]:
-                RecommendationEngine.RECOMMENDATIONS[emotion][rec_type].append(recommendation)
-                return True
-        return False
+        return RecommendationCatalog.default().add(emotion.lower(), rec_type, recommendation)
     
     @staticmethod
     def get_available_emotions() -> List[str]:
         """Get list of all available emotions"""
-        return list(RecommendationEngine.RECOMMENDATIONS.keys())
+        return RecommendationCatalog.default().emotions()
     
     @staticmethod
     def get_available_types() -> List[str]:
         """Get list of all recommendation types"""
-        return ['songs', 'quotes', 'activities']
\ No newline at end of file
+        return RecommendationCatalog.default().types()
\ No newline at end of file
@@ -0,0 +1,214 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Mapping, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class _Snapshot:
+    """One immutable version of the catalog; readers hold on to whichever one they got"""
+    
+    __slots__ = ('index', 'emotions', 'types', 'version')
+    
+    def __init__(self, index: Dict[Tuple[str, str], Tuple[str, ...]], emotions: List[str],
+                 types: List[str], version):
+        self.index = index
+        self.emotions = emotions
+        self.types = types
+        self.version = version
+
+
+class RecommendationCatalog:
+    """Recommendations indexed by (emotion, type), loaded lazily from JSON or SQLite.
+    
+    Lookups read the current snapshot without taking a lock, so they stay O(1)
+    however large the catalog is. A changed source file is picked up by a
+    background reload while readers keep using the old snapshot. Custom
+    additions are appended to a JSON file that is replaced atomically, so a
+    crash never leaves it half written.
+    
+    A JSON source maps emotion -> type -> list of recommendations. A SQLite
+    source (.db/.sqlite) needs a table
+    recommendations(emotion TEXT, rec_type TEXT, recommendation TEXT).
+    """
+    
+    _default = None
+    _default_lock = threading.Lock()
+    
+    def __init__(self, path: Optional[str] = None, custom_path: Optional[str] = None,
+                 builtin: Optional[Mapping[str, Mapping[str, List[str]]]] = None,
+                 reload_interval: float = 5.0):
+        self.path = path
+        self.custom_path = custom_path
+        self.builtin = builtin or {}
+        self.reload_interval = reload_interval
+        self.logger = logger
+        
+        self._snapshot = None
+        self._custom = None  # emotion -> type -> list, as stored in custom_path
+        self._load_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._reloading = threading.Lock()
+        self._next_check = 0.0
+        self._failed_version = None
+    
+    @classmethod
+    def default(cls) -> 'RecommendationCatalog':
+        """Process-wide catalog configured from MOODIFY_RECOMMENDATIONS* environment variables"""
+        with cls._default_lock:
+            if cls._default is None:
+                from recommend import RecommendationEngine
+                cls._default = cls(
+                    path=os.getenv("MOODIFY_RECOMMENDATIONS") or None,
+                    custom_path=os.getenv("MOODIFY_CUSTOM_RECOMMENDATIONS", "moodify_custom_recommendations.json") or None,
+                    builtin=RecommendationEngine.RECOMMENDATIONS,
+                    reload_interval=float(os.getenv("MOODIFY_RECOMMENDATIONS_RELOAD", "5"))
+                )
+            return cls._default
+    
+    def lookup(self, emotion: str, rec_type: str) -> Tuple[str, ...]:
+        """Every recommendation for an emotion and type, empty if there are none"""
+        return self._current().index.get((emotion, rec_type), ())
+    
+    def emotions(self) -> List[str]:
+        """Emotions with at least one recommendation, in catalog order"""
+        return list(self._current().emotions)
+    
+    def types(self) -> List[str]:
+        """Recommendation types in catalog order"""
+        return list(self._current().types)
+    
+    def has_emotion(self, emotion: str) -> bool:
+        """Whether the catalog knows the emotion at all"""
+        return emotion in self._current().emotions
+    
+    def add(self, emotion: str, rec_type: str, recommendation: str) -> bool:
+        """Add a custom recommendation for an emotion and type the catalog already has.
+        
+        The addition is written to custom_path before it becomes visible, so it
+        survives reloads and restarts. Without a custom_path it lasts as long
+        as the process.
+        """
+        self._current()
+        with self._write_lock:
+            snapshot = self._snapshot
+            if (emotion, rec_type) not in snapshot.index:
+                return False
+            
+            custom = self._load_custom()
+            items = custom.setdefault(emotion, {}).setdefault(rec_type, [])
+            items.append(recommendation)
+            unchanged = self._source_version() == snapshot.version
+            if self.custom_path:
+                self._write_json(self.custom_path, custom)
+            self._custom = custom
+            
+            # Only the one index entry changes; every other tuple is shared with the old snapshot
+            index = dict(snapshot.index)
+            index[(emotion, rec_type)] = index.get((emotion, rec_type), ()) + (recommendation,)
+            # Our own write shouldn't look like an outside change, but one made before it still should
+            version = self._source_version() if unchanged else snapshot.version
+            self._snapshot = _Snapshot(index, snapshot.emotions, snapshot.types, version)
+        return True
+    
+    def reload(self):
+        """Rebuild the index from the sources now and swap it in"""
+        # Writers wait for the rebuild so no addition lands in the snapshot being replaced
+        with self._write_lock:
+            snapshot = self._build()
+            self._snapshot = snapshot
+        self.logger.info(f"Loaded {sum(len(items) for items in snapshot.index.values())} recommendations")
+    
+    def _current(self) -> _Snapshot:
+        """The snapshot to read, loading it on first use and checking for changes now and then"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._load_lock:
+                if self._snapshot is None:
+                    self.reload()
+                snapshot = self._snapshot
+        elif self.reload_interval and time.monotonic() >= self._next_check:
+            self._next_check = time.monotonic() + self.reload_interval
+            version = self._source_version()
+            if version not in (snapshot.version, self._failed_version) and self._reloading.acquire(blocking=False):
+                threading.Thread(target=self._background_reload, name="catalog-reload", daemon=True).start()
+        return snapshot
+    
+    def _background_reload(self):
+        """Reload off the request path; a broken file keeps the old snapshot until it changes again"""
+        version = self._source_version()
+        try:
+            self.reload()
+        except Exception as e:
+            self._failed_version = version
+            self.logger.error(f"Recommendation catalog reload failed, keeping the old one: {e}")
+        finally:
+            self._reloading.release()
+    
+    def _build(self) -> _Snapshot:
+        """Read the base catalog and the custom additions into a fresh index"""
+        version = self._source_version()
+        if self.path is None:
+            base = {emotion: dict(types) for emotion, types in self.builtin.items()}
+        elif self.path.lower().endswith(('.db', '.sqlite', '.sqlite3')):
+            base = self._read_sqlite(self.path)
+        else:
+            with open(self.path, encoding='utf-8') as f:
+                base = json.load(f)
+        if self.custom_path:
+            # The file may have been edited by hand; additions held only in memory must be kept
+            self._custom = None
+        custom = self._load_custom()
+        
+        index, emotions, types = {}, {}, {}
+        for source in (base, custom):
+            for emotion, by_type in source.items():
+                emotion = emotion.lower()
+                emotions.setdefault(emotion, None)
+                for rec_type, items in by_type.items():
+                    types.setdefault(rec_type, None)
+                    index[(emotion, rec_type)] = index.get((emotion, rec_type), ()) + tuple(items)
+        return _Snapshot(index, list(emotions), list(types), version)
+    
+    def _source_version(self):
+        """Modification times of the source files, to notice when they change"""
+        return tuple(os.stat(path).st_mtime_ns if os.path.exists(path) else None
+                     for path in (self.path, self.custom_path) if path)
+    
+    def _load_custom(self) -> Dict[str, Dict[str, List[str]]]:
+        """A copy of the custom additions, read from custom_path once (caller holds the write lock)"""
+        if self._custom is None:
+            self._custom = {}
+            if self.custom_path and os.path.exists(self.custom_path):
+                with open(self.custom_path, encoding='utf-8') as f:
+                    self._custom = json.load(f)
+        return {emotion: {rec_type: list(items) for rec_type, items in by_type.items()}
+                for emotion, by_type in self._custom.items()}
+    
+    @staticmethod
+    def _read_sqlite(path: str) -> Dict[str, Dict[str, List[str]]]:
+        """Group the rows of a SQLite catalog by emotion and type, keeping their order"""
+        catalog = {}
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            rows = connection.execute(
+                "SELECT emotion, rec_type, recommendation FROM recommendations ORDER BY rowid"
+            )
+            for emotion, rec_type, recommendation in rows:
+                catalog.setdefault(emotion, {}).setdefault(rec_type, []).append(recommendation)
+        finally:
+            connection.close()
+        return catalog
+    
+    @staticmethod
+    def _write_json(path: str, data: Dict):
+        """Write JSON atomically: a temp file flushed to disk, then renamed over the old one"""
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
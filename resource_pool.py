@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+import logging
+from azure.core.exceptions import HttpResponseError
+from circuit_breaker import CircuitBreaker
+from rate_limit import RetryPolicy, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+class PoolMember:
+    """One Azure Language resource with its clients, load and health"""
+    
+    def __init__(self, name: str, client=None, async_client=None):
+        self.name = name
+        self.client = client
+        self.async_client = async_client
+        self.in_flight = 0
+        self.latency = None  # smoothed seconds per call, None until the first call
+        self.failures = 0    # consecutive service failures
+        self.ejected = False
+        self.calls = 0
+        self.bucket = None   # this resource's own quota, when the pool knows it
+
+
+class ResourcePool:
+    """Spreads calls over several Azure resources, preferring the least loaded one.
+    
+    Each call goes to the healthy member with the lowest (in flight + 1) x latency,
+    so a slow region gets less traffic and an idle one gets more (a member with no
+    latency sample yet counts as the pool's average). With
+    `requests_per_minute` set, members that have used up their own quota are skipped
+    while others still have room, so every resource's quota gets used. A member that
+    fails `eject_after` times in a row is ejected until `probe` succeeds against it.
+    """
+    
+    def __init__(self, members: List[PoolMember], eject_after: int = 3, probe_interval: float = 10.0,
+                 probe: Optional[Callable[[PoolMember], None]] = None, smoothing: float = 0.2,
+                 requests_per_minute: Optional[float] = None):
+        if not members:
+            raise ValueError("A resource pool needs at least one member")
+        self.members = members
+        self.eject_after = eject_after
+        self.probe_interval = probe_interval
+        self.probe = probe
+        self.smoothing = smoothing
+        self.logger = logger
+        if requests_per_minute:
+            for member in members:
+                member.bucket = TokenBucket(requests_per_minute / 60)
+        
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self.members)
+    
+    def call(self, func: Callable[[PoolMember], object], avoid: Sequence[PoolMember] = ()):
+        """Run a blocking call on the best member, passing it the member to use.
+        
+        Members in `avoid` are only used if nothing else is available.
+        """
+        member = self._acquire(avoid)
+        started = time.monotonic()
+        try:
+            result = func(member)
+        except Exception as e:
+            self._release(member, time.monotonic() - started, e)
+            raise
+        self._release(member, time.monotonic() - started)
+        return result
+    
+    async def acall(self, func: Callable[[PoolMember], object], avoid: Sequence[PoolMember] = ()):
+        """Async twin of call() for coroutine functions"""
+        member = self._acquire(avoid)
+        started = time.monotonic()
+        try:
+            result = await func(member)
+        except asyncio.CancelledError:
+            # A cancelled hedge says nothing about the member's health or speed
+            self._release(member, None)
+            raise
+        except Exception as e:
+            self._release(member, time.monotonic() - started, e)
+            raise
+        self._release(member, time.monotonic() - started)
+        return result
+    
+    def stats(self) -> List[Dict]:
+        """Per-member load, latency and health"""
+        with self._lock:
+            return [{
+                'name': member.name,
+                'calls': member.calls,
+                'in_flight': member.in_flight,
+                'latency': member.latency,
+                'ejected': member.ejected
+            } for member in self.members]
+    
+    def _acquire(self, avoid: Sequence[PoolMember] = ()) -> PoolMember:
+        """Pick the member to send the next call to and count it as in flight"""
+        with self._lock:
+            # If every member is ejected, keep trying them rather than failing outright
+            candidates = [member for member in self.members if not member.ejected] or self.members
+            candidates = [member for member in candidates if member not in avoid] or candidates
+            candidates = [member for member in candidates
+                          if member.bucket is None or member.bucket.available() >= 1] or candidates
+            # Members without a sample yet are assumed as fast as the average, so their
+            # in-flight count still counts; with no samples anywhere this is least in flight
+            sampled = [m.latency for m in self.members if m.latency is not None]
+            prior = sum(sampled) / len(sampled) if sampled else 1.0
+            member = min(candidates, key=lambda m: ((m.in_flight + 1) * (prior if m.latency is None else m.latency),
+                                                    m.in_flight))
+            member.in_flight += 1
+            member.calls += 1
+            if member.bucket:
+                member.bucket.reserve()
+            return member
+    
+    def _release(self, member: PoolMember, latency: Optional[float], error: Optional[Exception] = None):
+        """Record a finished call and eject the member if it keeps failing"""
+        throttled = isinstance(error, HttpResponseError) and error.status_code == 429
+        if throttled and member.bucket:
+            # Only this resource is out of quota - send traffic to the others meanwhile
+            member.bucket.pause(RetryPolicy.retry_after(error) or 1.0)
+        
+        with self._lock:
+            member.in_flight -= 1
+            if latency is None:
+                return
+            if error is not None and not throttled and CircuitBreaker.is_service_failure(error):
+                member.failures += 1
+                if member.ejected or member.failures < self.eject_after:
+                    return
+                member.ejected = True
+            else:
+                member.failures = 0
+                if member.latency is None:
+                    member.latency = latency
+                else:
+                    member.latency += self.smoothing * (latency - member.latency)
+                return
+        
+        self.logger.warning(f"Ejected Azure resource {member.name} after {member.failures} failures")
+        threading.Thread(target=self._probe_until_healthy, args=(member,),
+                         name="pool-probe", daemon=True).start()
+    
+    def _probe_until_healthy(self, member: PoolMember):
+        """Background loop that puts an ejected member back once it answers again"""
+        while True:
+            time.sleep(self.probe_interval)
+            if self.probe is None:
+                break
+            try:
+                self.probe(member)
+            except Exception as e:
+                self.logger.info(f"Health check of {member.name} failed: {e}")
+                continue
+            break
+        
+        with self._lock:
+            member.ejected = False
+            # Without a real probe, one more failure ejects it again
+            member.failures = 0 if self.probe else self.eject_after - 1
+        self.logger.info(f"Azure resource {member.name} is back in the pool")
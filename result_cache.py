@@ -0,0 +1,182 @@
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+import logging
+from analysis_result import AnalysisResult
+
+logger = logging.getLogger(__name__)
+
+class ResultCache:
+    """Cache for Azure analysis results - in-memory LRU with an optional SQLite tier.
+    
+    Results are kept as AnalysisResult objects in memory and in their binary
+    encoding on disk; rows written as JSON by older versions still load.
+    """
+    
+    # Result keys that hold tuples, restored when reading an old JSON row
+    TUPLE_FIELDS = ('entities', 'pii_entities')
+    
+    # Expired rows are swept from disk once per this many writes
+    PRUNE_INTERVAL = 1000
+    
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 24 * 3600,
+                 db_path: Optional[str] = None, max_db_entries: int = 100000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_db_entries = max_db_entries
+        self.db_path = db_path
+        
+        self._memory = OrderedDict()  # key -> (stored_at, results)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'disk_hits': 0, 'evictions': 0,
+                       'disk_evictions': 0, 'expirations': 0}
+        
+        self._db = None
+        self._db_rows = 0
+        self._writes_since_prune = 0
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed ON results (accessed_at)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_results_stored ON results (stored_at)")
+            self._db.commit()
+            # Kept up to date on every write so pruning never has to count the table
+            self._db_rows = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            logger.info(f"Persisting analysis results to {db_path}")
+    
+    @classmethod
+    def from_env(cls) -> 'ResultCache':
+        """Build a cache from MOODIFY_CACHE_* environment variables"""
+        return cls(
+            max_entries=int(os.getenv("MOODIFY_CACHE_SIZE", "1000")),
+            ttl_seconds=float(os.getenv("MOODIFY_CACHE_TTL", str(24 * 3600))),
+            db_path=os.getenv("MOODIFY_CACHE_DB") or None,
+            max_db_entries=int(os.getenv("MOODIFY_CACHE_DB_SIZE", "100000"))
+        )
+    
+    @staticmethod
+    def make_key(text: str, features: Iterable[str]) -> str:
+        """Hash the normalized text and feature set so no raw text ends up in a key"""
+        normalized = ' '.join(unicodedata.normalize('NFC', text).split())
+        payload = normalized + '\x00' + ','.join(sorted(features))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[AnalysisResult]:
+        """Return a copy of the cached results, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, results = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return copy.deepcopy(results)
+                del self._memory[key]
+                self._stats['expirations'] += 1
+            
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, stored_at FROM results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, stored_at = row
+                    if now - stored_at <= self.ttl_seconds:
+                        self._db.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        results = self._decode(value)
+                        self._remember(key, stored_at, results)
+                        self._stats['hits'] += 1
+                        self._stats['disk_hits'] += 1
+                        return copy.deepcopy(results)
+                    self._db_rows -= self._db.execute("DELETE FROM results WHERE key = ?", (key,)).rowcount
+                    self._db.commit()
+                    self._stats['expirations'] += 1
+            
+            self._stats['misses'] += 1
+            return None
+    
+    def set(self, key: str, results: Dict):
+        """Store results in memory and, when configured, on disk"""
+        now = time.time()
+        results = copy.deepcopy(AnalysisResult.from_dict(results))
+        with self._lock:
+            self._remember(key, now, results)
+            if self._db is not None:
+                exists = self._db.execute("SELECT 1 FROM results WHERE key = ?", (key,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, results.encode(), now, now)
+                )
+                if exists is None:
+                    self._db_rows += 1
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= self.PRUNE_INTERVAL or self._db_rows > self.max_db_entries:
+                    self._prune_db()
+                self._db.commit()
+    
+    def clear(self):
+        """Drop every cached result from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+                self._db_rows = 0
+    
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+            if self._db is not None:
+                stats['disk_entries'] = self._db_rows
+        return stats
+    
+    def _remember(self, key: str, stored_at: float, results: AnalysisResult):
+        """Put an entry in the memory tier, evicting least recently used ones"""
+        self._memory[key] = (stored_at, results)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats['evictions'] += 1
+    
+    def _prune_db(self):
+        """Drop expired rows and the least recently used ones over the size limit (lock held).
+        
+        Both deletes walk an index. Going over the limit evicts an extra 1% so
+        the next writes don't each have to evict one row.
+        """
+        self._writes_since_prune = 0
+        self._db_rows -= self._db.execute(
+            "DELETE FROM results WHERE stored_at < ?", (time.time() - self.ttl_seconds,)
+        ).rowcount
+        if self._db_rows > self.max_db_entries:
+            overflow = self._db_rows - self.max_db_entries + self.max_db_entries // 100
+            evicted = self._db.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY accessed_at LIMIT ?)", (overflow,)
+            ).rowcount
+            self._db_rows -= evicted
+            self._stats['disk_evictions'] += evicted
+    
+    def _decode(self, value) -> AnalysisResult:
+        """Load results from a binary row, or from JSON (turning entity lists back into tuples)"""
+        if isinstance(value, bytes):
+            return AnalysisResult.decode(value)
+        results = json.loads(value)
+        for field in self.TUPLE_FIELDS:
+            if results.get(field) is not None:
+                results[field] = [tuple(item) for item in results[field]]
+        return AnalysisResult(results)
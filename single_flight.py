@@ -0,0 +1,54 @@
+import copy
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """Runs at most one call per key at a time; callers arriving meanwhile share its outcome.
+    
+    Followers get a deep copy of the leader's result (or its exception), so nobody
+    can mutate another caller's dict. Keys are forgotten as soon as the call ends,
+    so this never serves stale results - that is the result cache's job.
+    """
+    
+    def __init__(self):
+        self.logger = logger
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'shared': 0}
+    
+    def do(self, key: str, func: Callable):
+        """Run func for this key, or wait for the identical call already in flight"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self._stats['calls'] += 1
+            else:
+                self._stats['shared'] += 1
+        
+        if not leader:
+            self.logger.info("Joined an identical analysis already in flight")
+            return copy.deepcopy(future.result())
+        
+        try:
+            result = func()
+        except BaseException as e:
+            # Even a script stop must release the followers, not leave them waiting forever
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return result
+    
+    def stats(self) -> Dict[str, int]:
+        """Calls actually made and callers that shared another caller's call"""
+        with self._lock:
+            return dict(self._stats)
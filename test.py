@@ -1,16 +1,15 @@
 #Importing necessary libraries
 from dotenv import load_dotenv
 import os
-from azure.ai.textanalytics import TextAnalyticsClient
-from azure.core.credentials import AzureKeyCredential
+from client_factory import ClientFactory
 
 # Loading credentials
 load_dotenv()
 endpoint = os.getenv("AZURE_LANGUAGE_ENDPOINT")
 key = os.getenv("AZURE_LANGUAGE_KEY")
 
-# Creating client
-client = TextAnalyticsClient(endpoint=endpoint, credential=AzureKeyCredential(key))
+# Creating client (shares the app's connection pool)
+client = ClientFactory.default().client(endpoint, key)
 
 # Function to analyze sentiment
 def analyze_sentiment(text: str):
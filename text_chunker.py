@@ -0,0 +1,120 @@
+import re
+from typing import Dict, List, Optional
+
+class TextChunker:
+    """Splits long text at sentence boundaries and merges the per-chunk results back"""
+    
+    # Characters the Language service accepts in one document
+    MAX_DOCUMENT_CHARS = 5120
+    
+    # A sentence ends at . ! ? or an ellipsis followed by whitespace, or at a blank line
+    _SENTENCE_END = re.compile(r'(?<=[.!?…])["\')\]]*\s+|\n\s*\n')
+    
+    @classmethod
+    def split_sentences(cls, text: str) -> List[str]:
+        """Sentences of the text, each keeping its trailing whitespace so they join back losslessly"""
+        sentences = []
+        start = 0
+        for match in cls._SENTENCE_END.finditer(text):
+            sentences.append(text[start:match.end()])
+            start = match.end()
+        if start < len(text):
+            sentences.append(text[start:])
+        return sentences
+    
+    @classmethod
+    def chunk(cls, text: str, max_chars: Optional[int] = None) -> List[str]:
+        """Pack whole sentences into chunks of at most max_chars characters"""
+        max_chars = max_chars or cls.MAX_DOCUMENT_CHARS
+        chunks = []
+        current = ''
+        for sentence in cls.split_sentences(text):
+            if len(current) + len(sentence) <= max_chars:
+                current += sentence
+                continue
+            if current.strip():
+                chunks.append(current)
+            current = ''
+            # A single run-on "sentence" longer than a chunk is cut at the last space that fits
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(' ', 0, max_chars) + 1 or max_chars
+                chunks.append(sentence[:cut])
+                sentence = sentence[cut:]
+            current = sentence
+        if current.strip():
+            chunks.append(current)
+        return chunks
+    
+    @classmethod
+    def merge(cls, chunk_results: List[Dict], chunks: List[str], features: List[str]) -> Dict:
+        """Combine per-chunk results into one result for the whole text.
+        
+        A feature that failed on any chunk is None for the whole text, with the
+        chunk's error under 'errors' like analyze_texts_batch reports it.
+        """
+        merged = dict.fromkeys(features)
+        weights = [len(chunk) for chunk in chunks]
+        for feature in features:
+            errors = [result['errors'][feature] for result in chunk_results
+                      if feature in result.get('errors', {})]
+            if errors:
+                merged[feature] = None
+                merged.setdefault('errors', {})[feature] = errors[0]
+                continue
+            values = [result[feature] for result in chunk_results]
+            merged[feature] = getattr(cls, f'_merge_{feature}')(values, weights)
+        return merged
+    
+    @staticmethod
+    def _merge_sentiment(values: List[Dict], weights: List[int]) -> Dict:
+        """Length-weighted average of the scores; positive and negative chunks make it mixed"""
+        total = sum(weights)
+        scores = {
+            name: sum(value['scores'][name] * weight for value, weight in zip(values, weights)) / total
+            for name in ('positive', 'neutral', 'negative')
+        }
+        labels = {value['label'] for value in values}
+        if 'mixed' in labels or {'positive', 'negative'} <= labels:
+            label = 'mixed'
+        else:
+            label = max(scores, key=scores.get)
+        return {'label': label, 'scores': scores}
+    
+    @staticmethod
+    def _merge_key_phrases(values: List[List[str]], weights: List[int]) -> List[str]:
+        """Every chunk's phrases in order, dropping repeats regardless of case"""
+        phrases = {}
+        for value in values:
+            for phrase in value:
+                phrases.setdefault(phrase.casefold(), phrase)
+        return list(phrases.values())
+    
+    @staticmethod
+    def _merge_entities(values: List[List[tuple]], weights: List[int]) -> List[tuple]:
+        """One entry per (text, category), keeping the highest confidence seen"""
+        entities = {}
+        for value in values:
+            for text, category, confidence in value:
+                key = (text, category)
+                if key not in entities or confidence > entities[key][2]:
+                    entities[key] = (text, category, confidence)
+        return list(entities.values())
+    
+    @staticmethod
+    def _merge_language(values: List[Dict], weights: List[int]) -> Dict:
+        """The language covering the most text, with its length-weighted confidence"""
+        coverage = {}
+        for value, weight in zip(values, weights):
+            coverage.setdefault(value['code'], []).append((value, weight))
+        detections = max(coverage.values(), key=lambda found: sum(weight for _, weight in found))
+        total = sum(weight for _, weight in detections)
+        return {
+            'name': detections[0][0]['name'],
+            'code': detections[0][0]['code'],
+            'confidence': sum(value['confidence'] * weight for value, weight in detections) / total
+        }
+    
+    @staticmethod
+    def _merge_pii_entities(values: List[List[tuple]], weights: List[int]) -> List[tuple]:
+        """Every chunk's PII entities, dropping repeats"""
+        return list(dict.fromkeys(entity for value in values for entity in value))